@@ -0,0 +1,191 @@
+# coding: utf-8
+"""
+Name: async_client.py
+
+asyncio version of TwitterClient (aiohttp is needed).
+While one request waits for response, other crawls send their requests,
+so one process can run hundreds of crawls at once.
+The number of requests in flight is limited per endpoint and per token.
+Rate limit waits are asyncio.sleep(), so waiting crawl can be cancelled.
+
+Usage:
+    async with AsyncTwitterClient(headers, token_pool=load_token_pool()) as client:
+        response = await client.get(url, params=payload)
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+import asyncio
+from json_codec import loads
+from rate_limit import RateLimiter, endpoint_key
+from retry import MAX_RETRIES, retry_request_async
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+POOL_SIZE = 100
+TIMEOUT = 10
+# requests in flight at once.
+ENDPOINT_CONCURRENCY = 50
+TOKEN_CONCURRENCY = 20
+
+
+def require_aiohttp():
+    """raise ImportError if aiohttp is not installed."""
+    if aiohttp is None:
+        raise ImportError("aiohttp is needed to run crawls by asyncio. "
+                          "pip install aiohttp")
+
+
+class Response:
+    """Response.
+    body is read before connection is released, so it can be used like
+    requests.models.Response (status_code, headers, text, json()).
+    """
+
+    def __init__(self, url: str, status_code: int, headers, content: bytes):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return loads(self.content)
+
+
+class AsyncTwitterClient:
+    """AsyncTwitterClient.
+    aiohttp session, rate limiter and retry are shared by all tasks.
+    """
+
+    def __init__(self, headers: dict, rate_limiter: RateLimiter = None,
+                 pool_size: int = POOL_SIZE, timeout: float = TIMEOUT,
+                 endpoint_concurrency: int = ENDPOINT_CONCURRENCY,
+                 token_concurrency: int = TOKEN_CONCURRENCY, token_pool=None):
+        """__init__.
+
+        Args:
+            headers (dict): headers sent to Twitter API.
+            rate_limiter (RateLimiter): rate_limiter
+            pool_size (int): max connections.
+            timeout (float): request timeout seconds.
+            endpoint_concurrency (int): max requests in flight per endpoint.
+            token_concurrency (int): max requests in flight per token.
+            token_pool (TokenPool): If set, Authorization of headers is replaced by its tokens.
+        """
+        require_aiohttp()
+        self.headers = headers
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.token_pool = token_pool
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.endpoint_concurrency = endpoint_concurrency
+        self.token_concurrency = token_concurrency
+        self.session = None
+        self._semaphores = {}
+        self.timings = {"requests": 0, "bytes": 0, "in_flight": 0,
+                        "max_in_flight": 0}
+
+    async def __aenter__(self):
+        self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def open(self):
+        """open.
+        aiohttp session must be created in running event loop.
+        """
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"Accept-Encoding": "gzip, deflate"})
+
+    def _semaphore(self, key, limit: int) -> asyncio.Semaphore:
+        """_semaphore.
+        semaphore per endpoint or token. It is created at first use.
+        """
+        if key not in self._semaphores:
+            self._semaphores[key] = asyncio.Semaphore(limit)
+        return self._semaphores[key]
+
+    async def get(self, url: str, params: dict = None, on_wait=None,
+                  headers: dict = None):
+        """get.
+        send GET request to Twitter API. rate limit and retry are handled.
+
+        Args:
+            url (str): url
+            params (dict): params
+            on_wait: called before sleeping until rate limit is reset.
+            headers (dict): headers added to client headers.
+
+        Returns:
+            Response:
+        """
+        self.open()
+        endpoint = self._semaphore(endpoint_key(url), self.endpoint_concurrency)
+        if self.token_pool is None:
+            async with endpoint:
+                return await retry_request_async(
+                    lambda: self._send(url, params, {**self.headers, **(headers or {})}),
+                    url, self.rate_limiter, on_wait=on_wait)
+
+        base_headers = {key: value for key, value in self.headers.items()
+                        if key.lower() != "authorization"}
+        base_headers.update(headers or {})
+        # When token gets 429, send again by other token, up to MAX_RETRIES times.
+        for _ in range(MAX_RETRIES + 1):
+            token = self.token_pool.choose(url)
+            token_headers = {**base_headers, **self.token_pool.authorization(token)}
+            async with endpoint, self._semaphore(token, self.token_concurrency):
+                response = await retry_request_async(
+                    lambda: self._send(url, params, token_headers),
+                    url, self.token_pool.rate_limiter(token), on_wait=on_wait,
+                    retry_429=False)
+            if response.status_code != 429:
+                return response
+        return response
+
+    async def _send(self, url: str, params: dict, headers: dict) -> Response:
+        """_send.
+        send request and read body.
+        """
+        timings = self.timings
+        timings["in_flight"] += 1
+        timings["max_in_flight"] = max(timings["max_in_flight"],
+                                       timings["in_flight"])
+        try:
+            async with self.session.get(url, params=params,
+                                        headers=headers) as response:
+                content = await response.read()
+        finally:
+            timings["in_flight"] -= 1
+        timings["requests"] += 1
+        timings["bytes"] += len(content)
+        return Response(url, response.status, response.headers, content)
+
+    def show_timings(self):
+        """show_timings.
+        display the number of requests and max requests in flight.
+        """
+        timings = self.timings
+        print("{} requests, {} bytes, max {} requests in flight."
+              .format(timings["requests"], timings["bytes"],
+                      timings["max_in_flight"]))
+        if self.token_pool is not None:
+            self.token_pool.show_quota()
+
+    async def close(self):
+        """close."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
@@ -0,0 +1,211 @@
+# coding: utf-8
+"""
+Name: async_crawl.py
+
+Run many crawls in one process by asyncio (aiohttp is needed).
+Each user is one task. Tasks share AsyncTwitterClient, so requests in
+flight are limited per endpoint and per token, and tasks wait for rate
+limit without blocking other tasks. Ctrl-C cancels all tasks, and
+crawls continue from checkpoint on next run.
+Pages are saved to csvfiles and twitter.sqlite (see twitter_db.py).
+
+jobs file is same as crawl_jobs.py ("<user_id> <job type>" per line).
+job type:
+    followers: fetch_follower_list.py
+    likes: fetch_favorite_tweets.py
+    timeline: user's tweets (up to 3200), same as crawl_jobs.py
+
+Usage:
+    python3 async_crawl.py -f <jobs file>
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+import argparse
+import asyncio
+import os
+import time
+from async_client import (AsyncTwitterClient, ENDPOINT_CONCURRENCY,
+                          TOKEN_CONCURRENCY)
+from checkpoint import Checkpoint
+from credentials import load_token_pool
+from crawl_jobs import read_jobs_file
+from records import TweetBatch, UserBatch
+from csv_sink import CsvSink
+from twitter_db import TwitterDB
+import fetch_favorite_tweets
+import fetch_follower_list
+import monitor_timeline_per1min
+
+JOB_TYPES = ("followers", "likes", "timeline")
+
+
+def parse_args():
+    """set jobs file and concurrency from stdin."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-f", "--file", required=True, type=str,
+                        help="jobs file. each line is '<user_id> <job type>'")
+    parser.add_argument("--endpoint-concurrency", type=int,
+                        default=ENDPOINT_CONCURRENCY,
+                        help="max requests in flight per endpoint")
+    parser.add_argument("--token-concurrency", type=int,
+                        default=TOKEN_CONCURRENCY,
+                        help="max requests in flight per token")
+    p = parser.parse_args()
+    args = {"file": p.file, "endpoint_concurrency": p.endpoint_concurrency,
+            "token_concurrency": p.token_concurrency}
+    return args
+
+
+def show_waiting(user_id, job_type, fetched):
+    """one line message. progress bar of many tasks can't be displayed at once."""
+    print("{} {}: {} rows fetched, waiting for rate limit reset."
+          .format(user_id, job_type, fetched))
+
+
+async def fetch_pages(url, payload, client, user_id, fetched, checkpoint,
+                      save_page, batch_type, job_type, store_page=None):
+    """fetch all pages and save them by save_page. next_token is saved to checkpoint.
+    each page is passed to save_page as batch_type (UserBatch or TweetBatch).
+    If store_page is set, json_res['data'] of each page is passed to it (db)."""
+    with CsvSink(checkpoint.csv_file) as sink:
+        return await fetch_pages_to(url, payload, client, user_id, fetched,
+                                    checkpoint, save_page, batch_type, job_type,
+                                    sink, store_page)
+
+
+async def fetch_pages_to(url, payload, client, user_id, fetched, checkpoint,
+                         save_page, batch_type, job_type, sink, store_page=None):
+    """fetch_pages() which saves pages to open csvfile."""
+    while True:
+        response = await client.get(
+            url, params=payload,
+            on_wait=lambda: show_waiting(user_id, job_type, fetched))
+        fetch_follower_list.display_requests_error(response)
+
+        json_res = response.json()
+        if 'data' not in json_res:
+            checkpoint.clear()
+            return fetched
+        offset = save_page(batch_type.from_json(json_res['data']), sink)
+        if store_page is not None:
+            store_page(json_res['data'])
+        fetched += len(json_res['data'])
+
+        # Remaining data is exist,update payload, request again
+        if 'next_token' in json_res['meta']:
+            payload.update(pagination_token=json_res['meta']['next_token'])
+            checkpoint.save(json_res['meta']['next_token'], fetched, offset)
+        else:
+            checkpoint.clear()
+            return fetched
+
+
+async def fetch_followers_data(url, payload, client, user_id,
+                               fetched_followers, checkpoint, db=None):
+    """async version of fetch_follower_list.fetch_followers_data.
+    return the number of fetched followers."""
+    return await fetch_pages(
+        url, payload, client, user_id, fetched_followers, checkpoint,
+        fetch_follower_list.save_file, UserBatch, "followers",
+        db and (lambda followers: db.add_followers(user_id, followers)))
+
+
+async def fetch_liked_tweets(url, payload, client, user_id,
+                             fetched_favourites_count, checkpoint, db=None):
+    """async version of fetch_favorite_tweets.fetch_liked_tweets.
+    return the number of fetched tweets."""
+    return await fetch_pages(
+        url, payload, client, user_id, fetched_favourites_count, checkpoint,
+        fetch_favorite_tweets.save_file, TweetBatch, "likes",
+        db and (lambda tweets: db.add_likes(user_id, tweets)))
+
+
+def save_timeline(tweets, user_id, sink):
+    """save tweets to <user_id>_timeline_data.csv (same rows as monitor_timeline_per1min.py).
+    return csvfile size after page is written to disk."""
+    sink.write_rows([[str(tweet_id), text,
+                      "https://twitter.com/" + user_id + "/status/" + str(tweet_id)]
+                     for tweet_id, text in zip(tweets.ids, tweets.texts)])
+    return sink.sync()
+
+
+async def fetch_timeline(url, payload, client, user_id, fetched, checkpoint,
+                         db=None):
+    """async version of crawl_jobs.run_timeline (up to 3200 tweets).
+    return the number of fetched tweets."""
+    return await fetch_pages(
+        url, payload, client, user_id, fetched, checkpoint,
+        lambda tweets, sink: save_timeline(tweets, user_id, sink),
+        TweetBatch, "timeline",
+        db and (lambda tweets: db.add_tweets(tweets, user_id)))
+
+
+async def run_crawl(client, user_id, job_type, db):
+    """run one crawl. return the number of fetched rows.
+    If crawl starts from first page, follows which were not fetched again are deleted."""
+    if job_type == "followers":
+        payload = fetch_follower_list.create_params()
+        checkpoint = Checkpoint(fetch_follower_list.create_csv_name(user_id))
+        started_at = time.time()
+        fetched = checkpoint.resume(payload)
+        rows = await fetch_followers_data(
+            fetch_follower_list.create_url(user_id), payload, client, user_id,
+            fetched, checkpoint, db)
+        if fetched == 0:
+            db.prune_followers(user_id, started_at)
+        return rows
+    if job_type == "likes":
+        payload = fetch_favorite_tweets.create_params()
+        checkpoint = Checkpoint(fetch_favorite_tweets.create_csv_name(user_id))
+        return await fetch_liked_tweets(
+            fetch_favorite_tweets.create_url(user_id), payload, client, user_id,
+            checkpoint.resume(payload), checkpoint, db)
+    payload = {"tweet.fields": "created_at", "max_results": "100"}
+    checkpoint = Checkpoint(monitor_timeline_per1min.create_csv_name(user_id))
+    return await fetch_timeline(
+        monitor_timeline_per1min.create_url(user_id, "normal"), payload, client,
+        user_id, checkpoint.resume(payload), checkpoint, db)
+
+
+async def run_job(client, user_id, job_type, db):
+    """run one crawl and display result as soon as it finishes.
+    A failed job doesn't stop other jobs."""
+    try:
+        rows = await run_crawl(client, user_id, job_type, db)
+    except Exception as error:
+        print("-----FAILED {} {}: {}-----".format(job_type, user_id, error))
+        return
+    print("-----DONE {} {}: {} rows-----".format(job_type, user_id, rows))
+
+
+async def run_jobs(jobs, args):
+    """run all jobs at once."""
+    headers = fetch_follower_list.create_headers(os.getenv("BEARER_TOKEN", ""))
+    db = TwitterDB()
+    async with AsyncTwitterClient(
+            headers, token_pool=load_token_pool(),
+            endpoint_concurrency=args['endpoint_concurrency'],
+            token_concurrency=args['token_concurrency']) as client:
+        await asyncio.gather(
+            *(run_job(client, user_id, job_type, db) for user_id, job_type in jobs))
+        client.show_timings()
+    db.close()
+
+
+def main():
+    """
+    1. Set jobs file and concurrency from stdin.
+    2. Load tokens and create one client shared by all tasks.
+    3. Run all jobs as asyncio tasks.
+    """
+    args = parse_args()
+    jobs = [job for job in read_jobs_file(args['file']) if job[1] in JOB_TYPES]
+    try:
+        asyncio.run(run_jobs(jobs, args))
+    except KeyboardInterrupt:
+        print("-----CANCELLED. run again to continue from checkpoint.-----")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# coding: utf-8
+"""
+Name: checkpoint.py
+
+Save pagination state of a crawl next to its csvfile.
+Checkpoint has next_token, the number of fetched rows and csvfile size
+(or the number of rows written to ParquetSink).
+It is written after each page is appended, so resumed crawl truncates
+csvfile to the last committed page and continues from next_token.
+
+Usage:
+    checkpoint = Checkpoint("<user_id>_followers_data.csv")
+    fetched = checkpoint.resume(payload)
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+import json
+import os
+
+
+class Checkpoint:
+    """Checkpoint.
+    <csvfile>.checkpoint stores {"next_token", "rows", "offset"}.
+    """
+
+    def __init__(self, csv_file: str):
+        """__init__.
+
+        Args:
+            csv_file (str): csvfile which pages are appended to.
+        """
+        self.csv_file = csv_file
+        self.path = csv_file + ".checkpoint"
+
+    def load(self) -> dict:
+        """load.
+        If checkpoint doesn't exist, return None.
+
+        Returns:
+            dict:
+        """
+        try:
+            with open(self.path, mode="r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, next_token: str, rows: int, offset: int):
+        """save.
+        write temporary file and rename it, so checkpoint is never broken.
+
+        Args:
+            next_token (str): pagination_token for next page.
+            rows (int): the number of rows saved to csvfile.
+            offset (int): csvfile size after the page is appended.
+        """
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, mode="w") as f:
+            json.dump({"next_token": next_token, "rows": rows,
+                       "offset": offset}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def restore(self, truncate=None) -> dict:
+        """restore.
+        load checkpoint and drop rows appended after it was saved.
+
+        Args:
+            truncate: called with offset instead of truncating csvfile.
+                      (e.g. ParquetSink.truncate)
+
+        Returns:
+            dict:
+        """
+        state = self.load()
+        if state is None:
+            return None
+        if truncate is not None:
+            truncate(state['offset'])
+        else:
+            with open(self.csv_file, mode="a") as f:
+                f.truncate(state['offset'])
+        return state
+
+    def resume(self, payload: dict, truncate=None) -> int:
+        """resume.
+        continue from checkpoint. pagination_token of payload is updated.
+        If checkpoint doesn't exist (e.g. last crawl is finished), csvfile
+        is made again, so same rows are not appended twice.
+
+        Args:
+            payload (dict): params of next request.
+            truncate: called with offset instead of truncating csvfile.
+                      (e.g. ParquetSink.truncate)
+
+        Returns:
+            int: the number of fetched rows. 0 if crawl starts from first page.
+        """
+        state = self.restore(truncate)
+        if state is None:
+            self.start_over(truncate)
+            return 0
+        payload.update(pagination_token=state['next_token'])
+        return state['rows']
+
+    def start_over(self, truncate=None):
+        """start_over.
+        remove checkpoint and empty csvfile, so crawl from first page
+        doesn't append same rows again.
+
+        Args:
+            truncate: called with 0 instead of truncating csvfile.
+                      (e.g. ParquetSink.truncate)
+        """
+        self.clear()
+        if truncate is not None:
+            truncate(0)
+        else:
+            open(self.csv_file, mode="w").close()
+
+    def clear(self):
+        """clear.
+        remove checkpoint after crawl is finished.
+        """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,346 @@
+# coding: utf-8
+"""
+Name: crawl_jobs.py
+
+Crawl many users in one process.
+Jobs (user_id and job type) are saved to crawl_jobs.sqlite, and worker
+threads run them sharing one client, so all jobs share the tokens and
+rate limit. Stopped jobs continue from checkpoint on next run.
+Crawled data are saved to csvfiles and twitter.sqlite (see twitter_db.py).
+
+job type:
+    followers: fetch_follower_list.py
+    likes: fetch_favorite_tweets.py
+    timeline: user's tweets (up to 3200)
+    icons: fetch_follower_icon.py (<user_id>_followers_data.csv is needed)
+
+jobs file has "<user_id> <job type>" per line.
+
+Usage:
+    python3 crawl_jobs.py -f <jobs file> -w 4
+    python3 crawl_jobs.py --status
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import os
+from os.path import abspath, dirname, join
+import sqlite3
+import threading
+import time
+from checkpoint import Checkpoint
+from credentials import load_token_pool
+from csv_sink import SinkPool
+from icon_cache import IconCache
+from icon_downloader import IconDownloader
+from json_codec import response_json
+from profile_cache import ProfileCache
+from twitter_client import TwitterClient
+from twitter_db import TwitterDB
+from user_lookup import LOOKUP_SIZE, chunked
+import fetch_favorite_tweets
+import fetch_follower_icon
+import fetch_follower_list
+import monitor_timeline_per1min
+
+JOB_TYPES = ("followers", "likes", "timeline", "icons")
+QUEUE_FILE = "crawl_jobs.sqlite"
+WORKERS = 4
+ICON_WORKERS = 4
+
+
+def parse_args():
+    """set jobs file and the number of workers from stdin."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-f", "--file",
+                        help="jobs file. each line is '<user_id> <job type>'",
+                        type=str)
+    parser.add_argument("-w", "--workers", help="the number of jobs run at once",
+                        type=int, default=WORKERS)
+    parser.add_argument("--status", help="display jobs status",
+                        action="store_true")
+    p = parser.parse_args()
+    args = {"file": p.file, "workers": p.workers, "status": p.status}
+    return args
+
+
+def read_jobs_file(jobs_file):
+    """read '<user_id> <job type>' lines. '#' starts comment."""
+    jobs = []
+    with open(jobs_file, mode="r") as f:
+        for line in f:
+            fields = line.split("#")[0].replace(",", " ").split()
+            if not fields:
+                continue
+            user_id, job_type = fields[0], fields[1] if len(fields) > 1 else "followers"
+            if job_type not in JOB_TYPES:
+                raise ValueError("unknown job type: {}".format(job_type))
+            jobs.append((user_id, job_type))
+    return jobs
+
+
+class JobQueue:
+    """JobQueue.
+    jobs table in sqlite. status is pending, running, done or failed.
+    """
+
+    def __init__(self, path=QUEUE_FILE):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                            id INTEGER PRIMARY KEY, user_id TEXT,
+                            job_type TEXT, status TEXT DEFAULT 'pending',
+                            total INTEGER, rows INTEGER DEFAULT 0,
+                            started_at REAL, finished_at REAL, error TEXT,
+                            UNIQUE(user_id, job_type))""")
+        self._db.commit()
+
+    def _execute(self, sql, params=()):
+        """execute sql and commit."""
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+            self._db.commit()
+        return rows
+
+    def add(self, jobs):
+        """add (user_id, job_type). finished or failed job is run again."""
+        with self._lock:
+            for user_id, job_type in jobs:
+                self._db.execute(
+                    """INSERT INTO jobs (user_id, job_type) VALUES (?, ?)
+                       ON CONFLICT(user_id, job_type) DO UPDATE SET
+                       status = 'pending', rows = 0, error = NULL,
+                       started_at = NULL, finished_at = NULL
+                       WHERE status IN ('done', 'failed')""",
+                    (user_id, job_type))
+            self._db.commit()
+
+    def recover(self):
+        """jobs which were running when process was stopped become pending."""
+        self._execute("UPDATE jobs SET status = 'pending' WHERE status = 'running'")
+
+    def pending(self):
+        """pending jobs."""
+        return self._execute("SELECT * FROM jobs WHERE status = 'pending' ORDER BY id")
+
+    def all(self):
+        """all jobs."""
+        return self._execute("SELECT * FROM jobs ORDER BY id")
+
+    def set_total(self, job_id, total):
+        """set the number of rows to fetch (e.g. followers_count)."""
+        self._execute("UPDATE jobs SET total = ? WHERE id = ?", (total, job_id))
+
+    def start(self, job_id):
+        """mark job as running."""
+        self._execute("UPDATE jobs SET status = 'running', started_at = ?"
+                      " WHERE id = ?", (time.time(), job_id))
+
+    def progress(self, job_id, rows):
+        """update the number of fetched rows."""
+        self._execute("UPDATE jobs SET rows = ? WHERE id = ?", (rows, job_id))
+
+    def finish(self, job_id, rows):
+        """mark job as done."""
+        self._execute("UPDATE jobs SET status = 'done', rows = ?, finished_at = ?"
+                      " WHERE id = ?", (rows, time.time(), job_id))
+
+    def fail(self, job_id, error):
+        """mark job as failed."""
+        self._execute("UPDATE jobs SET status = 'failed', error = ?, finished_at = ?"
+                      " WHERE id = ?", (str(error), time.time(), job_id))
+
+    def close(self):
+        self._db.close()
+
+
+class JobCheckpoint(Checkpoint):
+    """JobCheckpoint.
+    Checkpoint which also saves the number of fetched rows to JobQueue.
+    """
+
+    def __init__(self, csv_file, queue, job_id):
+        super().__init__(csv_file)
+        self.queue = queue
+        self.job_id = job_id
+
+    def save(self, next_token, rows, offset):
+        super().save(next_token, rows, offset)
+        self.queue.progress(self.job_id, rows)
+
+
+def run_followers(client, queue, job, db):
+    """fetch followers of job user. same as fetch_follower_list.py --resume"""
+    user_id = job['user_id']
+    payload = fetch_follower_list.create_params()
+    checkpoint = JobCheckpoint(fetch_follower_list.create_csv_name(user_id),
+                               queue, job['id'])
+    started_at = time.time()
+    fetched = checkpoint.resume(payload)
+    rows = fetch_follower_list.fetch_followers_data(
+        fetch_follower_list.create_url(user_id), payload, client,
+        job['total'] or 1, user_id, fetched, checkpoint, db=db)
+    if fetched == 0:
+        # followers who were not fetched again unfollowed.
+        db.prune_followers(user_id, started_at)
+    return rows
+
+
+def run_likes(client, queue, job, db):
+    """fetch liked tweets of job user. same as fetch_favorite_tweets.py --resume"""
+    user_id = job['user_id']
+    payload = fetch_favorite_tweets.create_params()
+    checkpoint = JobCheckpoint(fetch_favorite_tweets.create_csv_name(user_id),
+                               queue, job['id'])
+    fetched = checkpoint.resume(payload)
+    return fetch_favorite_tweets.fetch_liked_tweets(
+        fetch_favorite_tweets.create_url(user_id), payload, client,
+        job['total'] or 1, user_id, fetched, checkpoint, db=db)
+
+
+def run_timeline(client, queue, job, db):
+    """fetch tweets of job user, 100 tweets per request.
+    next_token is saved to checkpoint, so rerun doesn't append same tweets."""
+    user_id = job['user_id']
+    url = monitor_timeline_per1min.create_url(user_id, "normal")
+    payload = {"tweet.fields": "created_at", "max_results": "100"}
+    csv_file = monitor_timeline_per1min.create_csv_name(user_id)
+    checkpoint = JobCheckpoint(csv_file, queue, job['id'])
+    fetched = checkpoint.resume(payload)
+    sinks = SinkPool(max_open=1)
+    try:
+        while True:
+            response = client.get(url, params=payload)
+            fetch_follower_list.display_requests_error(response)
+            json_res = response_json(response)
+            for tweet in json_res.get('data', []):
+                monitor_timeline_per1min.save_file(tweet, user_id, sinks)
+            db.add_tweets(json_res.get('data', []), user_id)
+            fetched += len(json_res.get('data', []))
+            if 'next_token' not in json_res.get('meta', {}):
+                checkpoint.clear()
+                return fetched
+            payload.update(pagination_token=json_res['meta']['next_token'])
+            checkpoint.save(json_res['meta']['next_token'], fetched,
+                            sinks.get(csv_file).sync())
+    finally:
+        sinks.close()
+
+
+def run_icons(client, queue, job, db):
+    """download icons of followers in <user_id>_followers_data.csv."""
+    df = fetch_follower_icon.read_csv(
+        fetch_follower_list.create_csv_name(job['user_id']))
+    user_ids = [str(user_id) for user_id in df['id']]
+    queue.set_total(job['id'], len(user_ids))
+    dir_path = join(abspath(dirname(__file__)), "icon")
+    fetched = 0
+    cache = IconCache(dir_path)
+    profiles = ProfileCache(db)
+    with IconDownloader(client, dir_path, ICON_WORKERS, cache=cache) as downloader:
+        for chunk in chunked(user_ids, LOOKUP_SIZE):
+            users = profiles.lookup(client, chunk, fields=("profile_image_url",))
+            for user_id, profile in users.items():
+                downloader.submit(profile['profile_image_url'], str(user_id))
+            fetched += len(users)
+            queue.progress(job['id'], fetched)
+    cache.close()
+    return fetched
+
+
+JOB_RUNNERS = {"followers": run_followers, "likes": run_likes,
+               "timeline": run_timeline, "icons": run_icons}
+# profile count which is used as total of each job type.
+JOB_TOTALS = {"followers": "followers_count", "likes": "like_count",
+              "timeline": "tweet_count"}
+
+
+def fetch_totals(client, queue, jobs, db):
+    """fetch followers_count etc. of all jobs by users/lookup (100 users per request).
+    cached profiles are not fetched."""
+    user_ids = sorted({job['user_id'] for job in jobs
+                       if job['job_type'] in JOB_TOTALS and not job['total']})
+    # public_metrics are fetched together, so followers_count checks their age.
+    users = ProfileCache(db).lookup(client, user_ids, fields=("followers_count",))
+    for job in jobs:
+        user = users.get(int(job['user_id']))
+        if user is not None and job['job_type'] in JOB_TOTALS:
+            queue.set_total(job['id'], user[JOB_TOTALS[job['job_type']]])
+
+
+def run_job(client, queue, job, db):
+    """run one job and record result."""
+    queue.start(job['id'])
+    print("-----START {} {}-----".format(job['job_type'], job['user_id']))
+    try:
+        rows = JOB_RUNNERS[job['job_type']](client, queue, job, db)
+    except Exception as error:
+        queue.fail(job['id'], error)
+        print("-----FAILED {} {}: {}-----".format(job['job_type'], job['user_id'], error))
+        return
+    queue.finish(job['id'], rows)
+    print("-----DONE {} {}: {} rows-----".format(job['job_type'], job['user_id'], rows))
+
+
+def show_status(queue):
+    """display status, throughput and ETA of each job."""
+    now = time.time()
+    print("{:>20} {:>9} {:>8} {:>10} {:>10} {:>9} {:>8}".format(
+        "user_id", "job", "status", "rows", "total", "rows/min", "ETA(min)"))
+    for job in queue.all():
+        rate = eta = None
+        if job['started_at']:
+            elapsed = (job['finished_at'] or now) - job['started_at']
+            rate = job['rows'] / elapsed * 60 if elapsed > 0 else None
+        if rate and job['total'] and job['status'] == 'running':
+            eta = max(0, job['total'] - job['rows']) / rate
+        print("{:>20} {:>9} {:>8} {:>10} {:>10} {:>9} {:>8}".format(
+            job['user_id'], job['job_type'], job['status'], job['rows'],
+            job['total'] if job['total'] is not None else "-",
+            "{:.0f}".format(rate) if rate else "-",
+            "{:.0f}".format(eta) if eta is not None else "-"))
+        if job['error']:
+            print("    {}".format(job['error']))
+
+
+def main():
+    """
+    1. Set jobs file and the number of workers from stdin.
+    2. Add jobs to crawl_jobs.sqlite. If --status is set, display jobs and exit.
+    3. Load tokens and create one client shared by all workers.
+    4. Fetch followers_count etc. of all users by users/lookup.
+    5. Run pending jobs by worker threads. Workers share one twitter.sqlite.
+    """
+    args = parse_args()
+    queue = JobQueue()
+    if args['file']:
+        queue.add(read_jobs_file(args['file']))
+    if args['status']:
+        show_status(queue)
+        return
+
+    queue.recover()
+    jobs = queue.pending()
+    client = TwitterClient(
+        fetch_follower_list.create_headers(os.getenv("BEARER_TOKEN", "")),
+        token_pool=load_token_pool(),
+        pool_size=args['workers'] * (ICON_WORKERS + 1))
+    db = TwitterDB()
+    fetch_totals(client, queue, jobs, db)
+    jobs = queue.pending()
+
+    with ThreadPoolExecutor(max_workers=args['workers']) as executor:
+        for job in jobs:
+            executor.submit(run_job, client, queue, job, db)
+
+    show_status(queue)
+    client.show_timings()
+    queue.close()
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# coding: utf-8
+"""
+Name: credentials.py
+
+Use several BEARER_TOKEN in turn.
+Each token has its own rate limit, so request is sent with the token
+which has the most remaining quota of the endpoint.
+
+BEARER_TOKENS is comma separated tokens exported by .bashrc.
+If it is not set, BEARER_TOKEN is used.
+
+Usage:
+    token_pool = load_token_pool()
+    client = TwitterClient(headers, token_pool=token_pool)
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+import os
+import threading
+from rate_limit import RateLimiter
+
+
+def load_bearer_tokens() -> list:
+    """load_bearer_tokens.
+    BEARER_TOKENS (comma separated) or BEARER_TOKEN is exported by .bashrc
+
+    Returns:
+        list:
+    """
+    tokens = os.getenv("BEARER_TOKENS", "").split(",")
+    tokens = [token.strip() for token in tokens if token.strip()]
+    if not tokens and os.getenv("BEARER_TOKEN"):
+        tokens = [os.getenv("BEARER_TOKEN")]
+    return tokens
+
+
+class TokenPool:
+    """TokenPool.
+    RateLimiter per token. choose() returns token which has the most headroom.
+    """
+
+    def __init__(self, tokens: list):
+        """__init__.
+
+        Args:
+            tokens (list): bearer tokens.
+        """
+        if not tokens:
+            raise ValueError("BEARER_TOKEN is not set.")
+        self.tokens = list(tokens)
+        self.rate_limiters = {token: RateLimiter() for token in self.tokens}
+        self.requests = {token: 0 for token in self.tokens}
+        self._lock = threading.Lock()
+
+    def choose(self, url: str) -> str:
+        """choose.
+        token which can send request soonest. If some tokens can send now,
+        the one which has the most remaining quota of the endpoint.
+
+        Args:
+            url (str): url
+
+        Returns:
+            str:
+        """
+        def headroom(token):
+            rate_limiter = self.rate_limiters[token]
+            return (rate_limiter.wait_time(url), -rate_limiter.remaining(url),
+                    self.requests[token])
+
+        with self._lock:
+            token = min(self.tokens, key=headroom)
+            self.requests[token] += 1
+        return token
+
+    def rate_limiter(self, token: str) -> RateLimiter:
+        """rate_limiter.
+
+        Args:
+            token (str): token
+
+        Returns:
+            RateLimiter:
+        """
+        return self.rate_limiters[token]
+
+    @staticmethod
+    def authorization(token: str) -> dict:
+        """authorization.
+
+        Args:
+            token (str): token
+
+        Returns:
+            dict:
+        """
+        return {"Authorization": "Bearer {}".format(token)}
+
+    def show_quota(self):
+        """show_quota.
+        display the number of requests sent by each token.
+        """
+        for i, token in enumerate(self.tokens):
+            print("token {}: {} requests.".format(i, self.requests[token]))
+
+
+def load_token_pool() -> TokenPool:
+    """load_token_pool.
+
+    Returns:
+        TokenPool:
+    """
+    return TokenPool(load_bearer_tokens())
@@ -0,0 +1,193 @@
+# coding: utf-8
+"""
+Name: csv_sink.py
+
+Write crawled rows to csvfile through one open file with large buffer.
+Rows of plain text are joined by comma at once, and only rows which
+have comma, quote or newline are formatted by csv module (quoted).
+Rows are written when buffer is full, flush_rows rows are waiting or
+flush_interval seconds passed. sync() is called when checkpoint is
+saved, so rows before checkpoint are on disk.
+SinkPool keeps csvfiles of many users open (e.g. monitor).
+
+Usage:
+    with CsvSink("<user_id>_followers_data.csv") as sink:
+        sink.write_rows(rows)
+        offset = sink.sync()
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+from collections import OrderedDict
+import csv
+import gzip
+import os
+import time
+
+BUFFER_SIZE = 1 << 20
+MAX_OPEN_FILES = 256
+
+
+def join_plain_rows(rows: list) -> str:
+    """join_plain_rows.
+    join rows of str by comma and newline. If a value has comma, quote
+    or newline (it must be quoted) or is not str, return None.
+    It is about 10 times faster than csv.writer.
+
+    Args:
+        rows (list): rows
+
+    Returns:
+        str:
+    """
+    try:
+        text = "\n".join(map(",".join, rows)) + "\n"
+    except TypeError:
+        return None
+    commas = sum(map(len, rows)) - len(rows)
+    if (text.count(",") != commas or text.count("\n") != len(rows) or
+            '"' in text or "\r" in text):
+        return None
+    return text
+
+
+class CsvSink:
+    """CsvSink.
+    append rows to csvfile. file is opened once.
+    """
+
+    def __init__(self, path: str, buffer_size: int = BUFFER_SIZE,
+                 flush_rows: int = None, flush_interval: float = None,
+                 compress: bool = False):
+        """__init__.
+
+        Args:
+            path (str): csvfile. If compress is set, it is gzip file.
+            buffer_size (int): bytes buffered before write.
+            flush_rows (int): flush when this number of rows are waiting.
+            flush_interval (float): flush when this seconds passed from last flush.
+            compress (bool): write gzip. offset of sync() is compressed size,
+                             so compressed file can't be truncated by checkpoint.
+        """
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        if compress:
+            self._file = gzip.open(path, mode="at", newline="", encoding="utf-8")
+        else:
+            self._file = open(path, mode="a", newline="", encoding="utf-8",
+                              buffering=buffer_size)
+        self._writer = csv.writer(self._file, lineterminator="\n")
+        self.rows = 0
+        self._pending = 0
+        self._flushed = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write_rows(self, rows):
+        """write_rows.
+
+        Args:
+            rows (list): list of row (list of values).
+        """
+        if not rows:
+            return
+        text = join_plain_rows(rows)
+        if text is None:
+            self._writer.writerows(rows)
+        else:
+            self._file.write(text)
+        self.rows += len(rows)
+        self._pending += len(rows)
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        """maybe_flush.
+        flush if flush_rows rows are waiting or flush_interval seconds passed.
+        """
+        if not self._pending:
+            return
+        if ((self.flush_rows is not None and self._pending >= self.flush_rows) or
+                (self.flush_interval is not None and
+                 time.monotonic() - self._flushed >= self.flush_interval)):
+            self.flush()
+
+    def flush(self):
+        """flush.
+        write buffered rows to file.
+        """
+        self._file.flush()
+        self._pending = 0
+        self._flushed = time.monotonic()
+
+    def sync(self) -> int:
+        """sync.
+        flush and fsync. It is called before checkpoint is saved.
+
+        Returns:
+            int: file size. It is used as checkpoint offset.
+        """
+        self.flush()
+        fileno = self._file.fileno()
+        os.fsync(fileno)
+        return os.fstat(fileno).st_size
+
+    def close(self):
+        """close."""
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class SinkPool:
+    """SinkPool.
+    CsvSink per csvfile. least recently used file is closed when too many files are open.
+    """
+
+    def __init__(self, max_open: int = MAX_OPEN_FILES, **options):
+        """__init__.
+
+        Args:
+            max_open (int): max open files.
+            options: CsvSink options (e.g. flush_interval).
+        """
+        self.max_open = max_open
+        self.options = options
+        self._sinks = OrderedDict()
+
+    def get(self, path: str) -> CsvSink:
+        """get.
+        open csvfile if it is not open.
+
+        Args:
+            path (str): csvfile
+
+        Returns:
+            CsvSink:
+        """
+        sink = self._sinks.get(path)
+        if sink is not None:
+            self._sinks.move_to_end(path)
+            return sink
+        if len(self._sinks) >= self.max_open:
+            _, oldest = self._sinks.popitem(last=False)
+            oldest.close()
+        sink = self._sinks[path] = CsvSink(path, **self.options)
+        return sink
+
+    def flush(self):
+        """flush.
+        flush all files.
+        """
+        for sink in self._sinks.values():
+            sink.flush()
+
+    def close(self):
+        """close."""
+        for sink in self._sinks.values():
+            sink.close()
+        self._sinks.clear()
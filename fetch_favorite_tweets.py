@@ -10,20 +10,37 @@ Author: Ryosuke Tomita
 Date: 2021/08/26
 """
 import argparse
+from functools import partial
 import os
 from os.path import abspath, dirname, join
 import sys
 import random
-import time
-import requests
+import shutil
+from checkpoint import Checkpoint
+from csv_sink import CsvSink
+from field_profiles import PROFILES, tweet_params
+from json_codec import response_json
+from storage import FAVOURITES_COLUMNS, ParquetSink, favourites_table, parquet_name
+from credentials import load_token_pool
+from profile_cache import ProfileCache
+from records import TweetBatch
+from twitter_client import TwitterClient
+from twitter_db import TwitterDB
 
 
 def parse_args():
     """set user_id from stdin."""
     parser = argparse.ArgumentParser()
     parser.add_argument("-i", "--userid", help="userid", type=str)
+    parser.add_argument("--resume", help="continue from last checkpoint",
+                        action="store_true")
+    parser.add_argument("--format", help="output format", default="csv",
+                        choices=("csv", "parquet"))
+    parser.add_argument("--fields", choices=PROFILES, default="minimal",
+                        help="fields of tweets and their authors")
     p = parser.parse_args()
-    args = {"userid": p.userid}
+    args = {"userid": p.userid, "resume": p.resume, "format": p.format,
+            "fields": p.fields}
     return args
 
 
@@ -38,10 +55,14 @@ def create_url(user_id):
     return url
 
 
-def create_params():
-    """max_results max =100"""
-    return {"tweet.fields": "lang,author_id",
-            "max_results": "100"}
+def create_csv_name(user_id):
+    """csvfile name contains target user_id."""
+    return user_id + '_' + 'favourites_tweets.csv'
+
+
+def create_params(profile="minimal"):
+    """max_results max =100. fields are selected by profile (see field_profiles.py)."""
+    return {**tweet_params(profile), "max_results": "100"}
 
 
 def random_user_agent():
@@ -71,22 +92,17 @@ def display_requests_error(response):
         )
 
 
-def fetch_favourites_count(headers, user_id):
-    """display progress bar,fetch the number of favorited tweet"""
-    params = {"user_id": user_id}
-    url = 'https://api.twitter.com/1.1/users/show.json'
-    response = requests.get(url, params=params, headers=headers,
-                            timeout=3)
-    display_requests_error(response)
-
+def fetch_favourites_count(client, user_id, cache):
+    """display progress bar,fetch the number of favorited tweet.
+    If profile is cached, API is not called."""
     try:
-        favourites_count = response.json()['favourites_count']
-        screen_name = response.json()['screen_name']
-    except KeyError:
-        print(response.status_code)
+        profile = cache.profile(client, user_id, fields=("like_count",))
+    except Exception as error:
+        print(error)
         sys.exit()
 
-    print("{} has {} favourites tweets.".format(screen_name, favourites_count))
+    favourites_count = profile['like_count']
+    print("{} has {} favourites tweets.".format(profile['username'], favourites_count))
     return favourites_count
 
 
@@ -109,48 +125,60 @@ def show_progress(max_data_size, fetched_data_size):
           '\033[0m')
 
 
-def save_file(favourites_tweets_json, user_id):
-    """save favorited tweet data to csv."""
-    csv_file = (user_id + '_' + 'favourites_tweets.csv')
-    with open(csv_file, mode="a") as f:
-        [f.write(
-            "{0},{1},{2},https://twitter.com/{2}/status/{1}".format(
-                j['text'], j['id'],j['author_id']
-                )
-            )
-        for i in favourites_tweets_json for j in i]
+def save_file(favourites_tweets, sink):
+    """save favorited tweets (TweetBatch) to csv. return csvfile size after writing."""
+    sink.write_rows(favourites_tweets.csv_rows())
+    return sink.sync()
 
 
-def fetch_liked_tweets(url, payload, headers, favourites_count,
-                       user_id, fetched_favourites_count):
-    """fetch user's all favorited tweets. Tweets can be fetched 1500 par 15 min."""
+def fetch_liked_tweets(url, payload, client, favourites_count,
+                       user_id, fetched_favourites_count, checkpoint,
+                       sink=None, db=None):
+    """fetch user's all favorited tweets. Tweets can be fetched 1500 par 15 min.
+    After each page is saved, next_token is saved to checkpoint.
+    csvfile is opened once. If ParquetSink is set, pages are saved to
+    parquet instead of csvfile. If db is set, pages are saved to db too.
+    return the number of fetched tweets."""
+    if sink is None:
+        with CsvSink(create_csv_name(user_id)) as csv_sink:
+            return fetch_liked_tweets(url, payload, client, favourites_count,
+                                      user_id, fetched_favourites_count,
+                                      checkpoint, csv_sink, db)
+
     while True:
-        favourites_tweets_json = []
-        response = requests.get(url,
-                                params=payload, headers=headers)
-
-        # When api rate limits, sleep 15min and see progress bar.
-        if response.status_code == 429:
-            fetched_favourites_count += 1500
-            show_progress(favourites_count, fetched_favourites_count)
-            time.sleep(60*15)
-            return fetch_liked_tweets(url, payload, headers,
-                                      favourites_count, user_id, fetched_favourites_count)
+        # When quota is used up, see progress bar and sleep until reset.
+        response = client.get(
+            url, params=payload,
+            on_wait=partial(show_progress, favourites_count,
+                            fetched_favourites_count))
 
         display_requests_error(response)
-        json_res = response.json()
+        json_res = response_json(response)
 
         try:
-            favourites_tweets_json.append(json_res['data'])
-            save_file(favourites_tweets_json, user_id)
+            favourites_tweets = TweetBatch.from_json(json_res['data'])
+            if isinstance(sink, CsvSink):
+                offset = save_file(favourites_tweets, sink)
+            else:
+                offset = sink.write_page(favourites_table(favourites_tweets))
+            if db is not None:
+                db.add_likes(user_id, json_res['data'],
+                             json_res.get('includes', {}).get('users', []))
         except KeyError:
             print("=====DONE=====")
+            checkpoint.clear()
             break
+        fetched_favourites_count += len(favourites_tweets)
 
         # Remaining data is exist,update payload, request again
         if 'next_token' in json_res['meta']:
             payload.update(pagination_token=json_res['meta']['next_token'])
-        else: break
+            checkpoint.save(json_res['meta']['next_token'],
+                            fetched_favourites_count, offset)
+        else:
+            checkpoint.clear()
+            break
+    return fetched_favourites_count
 
 
 def main():
@@ -158,20 +186,46 @@ def main():
     1. Get target userid from stdin.
     2. load token and create url, payload, headers.
     3. Check target user's favorited tweets number.
-    4. Save all favorited tweets.
+    4. If --resume is set, continue from checkpoint. Otherwise csvfile is made again.
+    5. Save all favorited tweets.
     """
     args = parse_args()
     user_id = args['userid']
 
     bearer_token = load_bearer_token()
     url = create_url(user_id)
-    payload = create_params()
-    headers = create_headers(bearer_token)
-
-    favourites_count = fetch_favourites_count(headers, user_id)
-
-    fetch_liked_tweets(url, payload, headers,
-                       favourites_count, user_id, fetched_favourites_count=0)
+    payload = create_params(args['fields'])
+    client = TwitterClient(create_headers(bearer_token),
+                           token_pool=load_token_pool())
+
+    db = TwitterDB()
+    favourites_count = fetch_favourites_count(client, user_id, ProfileCache(db))
+
+    sink = None
+    output_file = create_csv_name(user_id)
+    if args['format'] == "parquet":
+        output_file = parquet_name(output_file)
+        sink = ParquetSink(output_file, FAVOURITES_COLUMNS)
+
+    checkpoint = Checkpoint(output_file)
+    fetched_favourites_count = 0
+    if args['resume']:
+        fetched_favourites_count = checkpoint.resume(
+            payload, sink.truncate if sink else None)
+        if fetched_favourites_count:
+            print("resume from {} tweets.".format(fetched_favourites_count))
+    else:
+        # same tweets are not appended again.
+        checkpoint.start_over(sink.truncate if sink else None)
+
+    fetch_liked_tweets(url, payload, client,
+                       favourites_count, user_id,
+                       fetched_favourites_count=fetched_favourites_count,
+                       checkpoint=checkpoint, sink=sink, db=db)
+    db.close()
+    if sink is not None:
+        sink.compact()
+    client.show_timings()
 
 
 if __name__ == "__main__":
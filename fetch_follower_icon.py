@@ -10,12 +10,17 @@ Author: Ryosuke Tomita
 Date: 2021/08/26
 """
 import argparse
+from functools import partial
 import os
 from os.path import join, abspath, dirname
 import shutil
-import time
-import pandas as pd
-import requests
+from icon_cache import IconCache
+from storage import read_followers
+from icon_downloader import WORKERS, IconDownloader
+from credentials import load_token_pool
+from profile_cache import ProfileCache
+from twitter_client import TwitterClient
+from user_lookup import LOOKUP_SIZE, chunked
 
 
 def parse_args():
@@ -23,8 +28,14 @@ def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("-f", "--file",
                         help="set FollowersList.csv", type=str)
+    parser.add_argument("-w", "--workers", help="icon download threads",
+                        type=int, default=WORKERS)
+    parser.add_argument("--revalidate",
+                        help="ask server whether cached icons are changed",
+                        action="store_true")
     p = parser.parse_args()
-    args = {"file": p.file}
+    args = {"file": p.file, "workers": p.workers,
+            "revalidate": p.revalidate}
     return args
 
 
@@ -34,25 +45,9 @@ def load_bearer_token():
 
 
 def read_csv(csvfile):
-    """read followers_data created by fetch_follower_list.py"""
-    df = pd.read_csv(csvfile, header=0, encoding="utf-8",
-                     usecols=(0, 1, 2),
-                     names=('name', 'id', 'username'))
-
-    # avoid user_id is interpreted in exponantial.
-    with open(csvfile, mode='r') as f:
-        user_id_list = []
-        for i in range(len(df)):
-            user_id_list.append(f.readline().split(',')[1])
-
-    df['id'] = user_id_list
-    return df
-
-
-def create_params(user_id):
-    """user_id is exported by .bashrc."""
-    return {"user_id": user_id,
-            "include_entities": "false"}
+    """read followers_data created by fetch_follower_list.py
+    only id column is read as int64, so user_id is not interpreted in exponantial."""
+    return read_followers(csvfile, columns=['id'])
 
 
 def create_headers(bearer_token):
@@ -70,7 +65,7 @@ def show_progress(max_data_size, fetched_data_size):
     progressed_percent = fetched_data_size/max_data_size
     bar_cnt = int(max_bar_length * progressed_percent)
     dot_cnt = max_bar_length - bar_cnt
-    wait_time = int((1-progressed_percent)*max_data_size/300)*15
+    wait_time = int((1-progressed_percent)*max_data_size/(300*LOOKUP_SIZE))*15
 
     print("LEFT TIME IS {:.0f} min.    {}/{}"
           .format(wait_time, fetched_data_size, max_data_size))
@@ -80,70 +75,48 @@ def show_progress(max_data_size, fetched_data_size):
           '\033[0m')
 
 
-def fetch_followers_data(url, payload, headers, df_length, i):
-    """fetch user data to get user's icon url."""
-    response = requests.get(url, params=payload, headers=headers,
-                            timeout=3)
-
-    # When api rate limits, sleep 15min and see progress bar.
-    if response.status_code == 429:
-        show_progress(df_length, i)
-        time.sleep(60*15)
-        return fetch_followers_data(url, payload, headers, df_length, i)
-    json_res = response.json()
-
-    # When response eroor occure, display error message.
-    if response.status_code != 200:
-        print("Request returned an error: {} {}".format(
-              response.status_code, response.text))
-
-    return json_res
-
-
-def img_dl(icon_src, userid):
-    """From user's icon url, download image."""
-    img = requests.get(icon_src).content
-    img_name = str(userid)
-    dir_path = join(abspath(dirname(__file__)) + "/icon/")
-    with open((dir_path + img_name), "wb") as f:
-        f.write(img)
-
-
 def main():
     """
     1. Get csvfile path from stdin.
     2. Read csvfile as DataFrame.
-    3. Create url, bearer_token, headers.
+    3. Create bearer_token, headers.
     4. Check csvfile length to know the number of download icons.
-    5. Download user's icons.
+    5. Fetch icon url of 100 users per request and download user's icons
+       by worker threads. If icon url is not changed, cached icon is used.
+       Icon url of users in profile cache is not fetched.
     """
     args = parse_args()
 
     csv_file = args['file']
     df = read_csv(csv_file)
 
-    url = 'https://api.twitter.com/1.1/users/show.json'
     bearer_token = load_bearer_token()
-    headers = create_headers(bearer_token)
+    # one connection per worker to icon CDN, and one to API.
+    client = TwitterClient(create_headers(bearer_token),
+                           pool_size=args['workers'] + 1, pool_block=True,
+                           token_pool=load_token_pool())
+    dir_path = join(abspath(dirname(__file__)), "icon")
 
-    df_length = len(df['id'])  # data size.
+    user_ids = [str(user_id) for user_id in df['id']]
+    df_length = len(user_ids)  # data size.
 
     # download icon jpg file.
-    for i, user_id in enumerate(df['id']):
-        if not user_id:
-            continue
-        print(user_id)
-        payload = create_params(user_id)
-        user_object_json = fetch_followers_data(url, payload,
-                                            headers, df_length, i)
-        try:
-            icon_src = user_object_json['profile_image_url']
-            if not icon_src:
-                continue
-        except KeyError:
-            continue
-
-        img_dl(icon_src, df['id'][i])
+    cache = IconCache(dir_path)
+    profiles = ProfileCache()
+    with IconDownloader(client, dir_path, args['workers'], cache=cache,
+                        revalidate=args['revalidate']) as downloader:
+        for i, chunk in enumerate(chunked(user_ids, LOOKUP_SIZE)):
+            # When quota is used up, see progress bar and sleep until reset.
+            users = profiles.lookup(client, chunk, fields=("profile_image_url",),
+                                    on_wait=partial(show_progress, df_length,
+                                                    i*LOOKUP_SIZE))
+            for user_id, profile in users.items():
+                print(user_id)
+                downloader.submit(profile['profile_image_url'], str(user_id))
+    cache.close()
+    profiles.close()
+
+    client.show_timings()
 
 
 if __name__ == "__main__":
@@ -3,6 +3,8 @@
 Name: fetch_followerList.py
 
 Using Twitter API fetch follower list.
+--diff compares followers with last crawl and saves who followed and
+unfollowed to <user_id>_follower_changes.csv (see follower_snapshot.py).
 
 Usage: python3 fetch_followerList.py -i 920511017683247104
 
@@ -10,12 +12,26 @@ Author: Ryosuke Tomita
 Date: 2021/08/26
 """
 import argparse
+from datetime import datetime, timezone
+from functools import partial
 import os
 from os.path import abspath, dirname, join
 import random
 import shutil
 import time
+import numpy as np
 import requests
+from checkpoint import Checkpoint
+from csv_sink import CsvSink
+from field_profiles import PROFILES, follower_params
+from json_codec import response_json
+from follower_snapshot import STOP_RUN, SnapshotStore, diff_snapshot, known_run
+from storage import FOLLOWERS_COLUMNS, ParquetSink, followers_table, parquet_name
+from credentials import load_token_pool
+from profile_cache import ProfileCache
+from records import UserBatch
+from twitter_client import TwitterClient
+from twitter_db import TwitterDB
 
 
 def parse_args() -> dict:
@@ -29,8 +45,20 @@ def parse_args() -> dict:
     """
     parser = argparse.ArgumentParser()
     parser.add_argument("-i", "--userid", help="userid", type=str)
+    parser.add_argument("--resume", help="continue from last checkpoint",
+                        action="store_true")
+    parser.add_argument("--format", help="output format", default="csv",
+                        choices=("csv", "parquet"))
+    parser.add_argument("--diff", action="store_true",
+                        help="save followed and unfollowed users since last crawl")
+    parser.add_argument("--full", action="store_true",
+                        help="with --diff, fetch all followers to find all unfollows")
+    parser.add_argument("--fields", choices=PROFILES, default=None,
+                        help="fields of followers. default is metrics "
+                        "(minimal with --diff)")
     p = parser.parse_args()
-    args = {"userid": p.userid}
+    args = {"userid": p.userid, "resume": p.resume, "format": p.format,
+            "diff": p.diff, "full": p.full, "fields": p.fields}
     return args
 
 
@@ -59,17 +87,42 @@ def create_url(user_id: str) -> str:
     return "https://api.twitter.com/2/users/{}/followers".format(user_id)
 
 
-def create_params() -> dict:
+def create_csv_name(user_id: str) -> str:
+    """create_csv_name.
+    csvfile name contains target user_id.
+
+    Args:
+        user_id (str): user_id
+
+    Returns:
+        str:
+    """
+    return user_id + '_' + 'followers_data.csv'
+
+
+def create_changes_name(user_id: str) -> str:
+    """create_changes_name.
+
+    Args:
+        user_id (str): user_id
+
+    Returns:
+        str:
+    """
+    return user_id + '_' + 'follower_changes.csv'
+
+
+def create_params(profile: str = "metrics") -> dict:
     """create_params.
     max_results max == 1000
 
     Args:
+        profile (str): fields profile (see field_profiles.py).
 
     Returns:
         dict:
     """
-    return {"user.fields": "created_at",
-            "max_results": "1000"}
+    return {**follower_params(profile), "max_results": "1000"}
 
 
 def create_headers(bearer_token: str) -> dict:
@@ -118,26 +171,23 @@ def display_requests_error(response: requests.models.Response):
         )
 
 
-def fetch_followers_count(headers: dict, user_id: str) -> int:
+def fetch_followers_count(client: TwitterClient, user_id: str,
+                          cache: ProfileCache) -> int:
     """fetch_followers_count.
     To dislpay progress bar, fetch user's the number of followers.
+    If profile is cached, API is not called.
 
     Args:
-        headers (dict): headers
+        client (TwitterClient): client
         user_id (str): user_id
+        cache (ProfileCache): cache
 
     Returns:
         int:
     """
-    params = {"user_id": user_id}
-    url = 'https://api.twitter.com/1.1/users/show.json'
-    response = requests.get(url, params=params, headers=headers,
-                            timeout=3)
-    display_requests_error(response)
-
-    followers_count = response.json()['followers_count']
-    screen_name = response.json()['screen_name']
-    print("{} has {} followers.".format(screen_name, followers_count))
+    profile = cache.profile(client, user_id, fields=("followers_count",))
+    followers_count = profile['followers_count']
+    print("{} has {} followers.".format(profile['username'], followers_count))
     return followers_count
 
 
@@ -166,64 +216,172 @@ def show_progress(max_data_size: int, fetched_data_size: int):
           '\033[0m')
 
 
-def save_file(followers_json: list, user_id: str):
+def save_file(followers: UserBatch, sink: CsvSink) -> int:
     """save_file.
     save to csvfile. csvfile name contains target user_id
 
     Args:
-        followers_json (list): followers_json
-        user_id (str): user_id
+        followers (UserBatch): followers of a page.
+        sink (CsvSink): open csvfile.
+
+    Returns:
+        int: csvfile size after page is written to disk.
     """
-    csv_file = (user_id + '_' + 'followers_data.csv')
-    with open(csv_file, mode="a") as f:
-        for i in followers_json:
-            for j in i:
-                f.write(
-                    "{0}, {1}, {2}, https://twitter.com/intent/user?user_id={1}\n".format(
-                        j['name'].replace(',', ''), j['id'], j['username']
-            )
-        )
+    sink.write_rows(followers.csv_rows())
+    return sink.sync()
 
 
-def fetch_followers_data(url, payload, headers,
-                         followers_count, user_id, fetched_followers):
+def fetch_followers_data(url, payload, client,
+                         followers_count, user_id, fetched_followers,
+                         checkpoint, sink=None, db=None):
     """fetch_followers_data.
     fetch user's all followers data. Data can be fetched 15000 per 15min.
+    After each page is saved, next_token is saved to checkpoint.
+    csvfile is opened once. If ParquetSink is set, pages are saved to
+    parquet instead of csvfile. If db is set, pages are saved to db too.
 
     Args:
         url:
         payload:
-        headers:
+        client:
         followers_count:
         user_id:
         fetched_followers:
+        checkpoint:
+        sink:
+        db:
+
+    Returns:
+        int: the number of fetched followers.
     """
+    if sink is None:
+        with CsvSink(create_csv_name(user_id)) as csv_sink:
+            return fetch_followers_data(url, payload, client, followers_count,
+                                        user_id, fetched_followers,
+                                        checkpoint, csv_sink, db)
+
     while True:
-        followers_json = []
-        response = requests.get(url,
-                                params=payload, headers=headers)
-
-        # When api rate limits, sleep 15min and see progress bar.
-        if response.status_code == 429:
-            fetched_followers += 15000
-            show_progress(followers_count, fetched_followers)
-            time.sleep(60*15)
-            return fetch_followers_data(url, payload, headers,
-                    followers_count, user_id, fetched_followers)
+        # When quota is used up, see progress bar and sleep until reset.
+        response = client.get(
+            url, params=payload,
+            on_wait=partial(show_progress, followers_count, fetched_followers))
         display_requests_error(response)
 
-        json_res = response.json()
+        json_res = response_json(response)
         try:
-            followers_json.append((json_res['data']))
-            save_file(followers_json, user_id)
+            followers = UserBatch.from_json(json_res['data'])
+            if isinstance(sink, CsvSink):
+                offset = save_file(followers, sink)
+            else:
+                offset = sink.write_page(followers_table(followers))
+            if db is not None:
+                db.add_followers(user_id, json_res['data'])
         except KeyError:
+            checkpoint.clear()
             break
+        fetched_followers += len(followers)
 
         # Remaining data is exist,update payload, request again
         if 'next_token' in json_res['meta']:
             payload.update(pagination_token=json_res['meta']['next_token'])
+            checkpoint.save(json_res['meta']['next_token'],
+                            fetched_followers, offset)
         else:
+            checkpoint.clear()
             break
+    return fetched_followers
+
+
+def fetch_followers_ids(url, payload, client, followers_count,
+                        previous=None, stop_run=STOP_RUN):
+    """fetch_followers_ids.
+    fetch follower ids, newest first. If previous snapshot is set, stop
+    when stop_run followers in a row are in previous snapshot.
+
+    Args:
+        url:
+        payload:
+        client:
+        followers_count:
+        previous: follower ids of last snapshot.
+        stop_run: stop_run
+
+    Returns:
+        tuple: (follower ids, True if all followers are fetched)
+    """
+    previous_sorted = np.sort(previous) if previous is not None else None
+    pages = []
+    fetched_followers = 0
+    run = 0
+    while True:
+        response = client.get(
+            url, params=payload,
+            on_wait=partial(show_progress, followers_count, fetched_followers))
+        display_requests_error(response)
+
+        json_res = response_json(response)
+        page = np.array([int(j['id']) for j in json_res.get('data', [])],
+                        dtype=np.int64)
+        pages.append(page)
+        fetched_followers += len(page)
+
+        if previous_sorted is not None and len(page):
+            run = known_run(run, np.isin(page, previous_sorted))
+            if run >= stop_run:
+                return np.concatenate(pages), False
+        if 'next_token' not in json_res.get('meta', {}):
+            return np.concatenate(pages), True
+        payload.update(pagination_token=json_res['meta']['next_token'])
+
+
+def save_changes(user_id: str, gained, lost, taken_at: str):
+    """save_changes.
+    append followed and unfollowed users to csvfile.
+
+    Args:
+        user_id (str): user_id
+        gained: follower ids who followed.
+        lost: follower ids who unfollowed.
+        taken_at (str): crawl time.
+    """
+    with CsvSink(create_changes_name(user_id)) as sink:
+        sink.write_rows([[taken_at, "follow", str(i)] for i in gained] +
+                        [[taken_at, "unfollow", str(i)] for i in lost])
+
+
+def diff_followers(url, payload, client, followers_count, user_id, full=False,
+                   db=None):
+    """diff_followers.
+    fetch followers until known followers come, and compare them with
+    last snapshot. New snapshot is saved, and follows of db are updated.
+
+    Args:
+        url:
+        payload:
+        client:
+        followers_count:
+        user_id:
+        full: fetch all followers.
+        db: db
+    """
+    store = SnapshotStore(user_id)
+    previous = store.latest()
+    taken_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    fetched, complete = fetch_followers_ids(
+        url, payload, client, followers_count,
+        None if full else previous)
+
+    gained, lost, snapshot = diff_snapshot(previous, fetched, complete)
+    store.save(snapshot, taken_at)
+    if db is not None:
+        db.add_follower_ids(user_id, fetched)
+        db.remove_followers(user_id, lost)
+    if previous is None:
+        print("first snapshot: {} followers.".format(len(snapshot)))
+        return
+    save_changes(user_id, gained, lost, taken_at)
+    print("{} followed, {} unfollowed. ({} followers fetched)"
+          .format(len(gained), len(lost), len(fetched)))
 
 
 def main():
@@ -231,20 +389,59 @@ def main():
     1. Get userid from stdin.
     2. Load token and create payload,url,header.
     3. Check target user's followers number.
-    4. Fetch followers data.
+    4. If --diff is set, compare followers with last snapshot and exit.
+    5. If --resume is set, continue from checkpoint. Otherwise start new file.
+    6. Fetch followers data and save them to file and twitter.sqlite.
+       After full crawl, followers who unfollowed are deleted from db.
     """
     args = parse_args()
     user_id = args['userid']
 
     bearer_token = load_bearer_token()
     url = create_url(user_id)
-    payload = create_params()
-    headers = create_headers(bearer_token)
-
-    followers_count = fetch_followers_count(headers, user_id)
-
-    fetch_followers_data(url, payload, headers, followers_count, user_id,
-                         fetched_followers=0)
+    # --diff needs only ids.
+    payload = create_params(args['fields'] or
+                            ("minimal" if args['diff'] else "metrics"))
+    client = TwitterClient(create_headers(bearer_token),
+                           token_pool=load_token_pool())
+
+    db = TwitterDB()
+    followers_count = fetch_followers_count(client, user_id, ProfileCache(db))
+
+    if args['diff']:
+        diff_followers(url, payload, client, followers_count, user_id,
+                       full=args['full'], db=db)
+        db.close()
+        client.show_timings()
+        return
+
+    sink = None
+    output_file = create_csv_name(user_id)
+    if args['format'] == "parquet":
+        output_file = parquet_name(output_file)
+        sink = ParquetSink(output_file, FOLLOWERS_COLUMNS)
+
+    checkpoint = Checkpoint(output_file)
+    fetched_followers = 0
+    started_at = time.time()
+    if args['resume']:
+        fetched_followers = checkpoint.resume(payload, sink.truncate if sink else None)
+        if fetched_followers:
+            print("resume from {} followers.".format(fetched_followers))
+            started_at = None
+    else:
+        # same followers are not appended again.
+        checkpoint.start_over(sink.truncate if sink else None)
+
+    fetch_followers_data(url, payload, client, followers_count, user_id,
+                         fetched_followers=fetched_followers,
+                         checkpoint=checkpoint, sink=sink, db=db)
+    if started_at is not None:
+        db.prune_followers(user_id, started_at)
+    db.close()
+    if sink is not None:
+        sink.compact()
+    client.show_timings()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,75 @@
+# coding: utf-8
+"""
+Name: field_profiles.py
+
+Named sets of fields and expansions requested by API v2.
+Each profile requests only fields which are used by next stage, so
+pages are small and user objects needed by icons or rank are fetched
+with the same page (they are saved to twitter.sqlite and used by
+profile_cache.py without users/lookup). Each fields group has its own
+fetched time in users table, so icon url of icons page is fresh even if
+metrics of the user are old, and metrics page doesn't make icon url fresh.
+
+profile:
+    minimal: fields which are saved to csvfile.
+    icons: minimal and profile_image_url.
+    metrics: minimal, created_at and public_metrics.
+    full: all fields which are saved to twitter.sqlite.
+
+Usage:
+    payload = follower_params("icons")
+    payload = tweet_params("metrics")
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+
+PROFILES = ("minimal", "icons", "metrics", "full")
+
+# id, name and username of user are always returned.
+FOLLOWER_FIELDS = {
+    "minimal": {},
+    "icons": {"user.fields": "profile_image_url"},
+    "metrics": {"user.fields": "created_at,public_metrics"},
+    "full": {"user.fields": "created_at,profile_image_url,public_metrics"},
+}
+
+# id and text of tweet are always returned. author is expanded to
+# includes.users, so icon and metrics of authors are fetched by same page.
+TWEET_FIELDS = {
+    "minimal": {"tweet.fields": "author_id,lang"},
+    "icons": {"tweet.fields": "author_id,lang", "expansions": "author_id",
+              "user.fields": "profile_image_url"},
+    "metrics": {"tweet.fields": "author_id,lang,created_at",
+                "expansions": "author_id",
+                "user.fields": "public_metrics"},
+    "full": {"tweet.fields": "author_id,lang,created_at",
+             "expansions": "author_id",
+             "user.fields": "created_at,profile_image_url,public_metrics"},
+}
+
+
+def follower_params(profile: str) -> dict:
+    """follower_params.
+    fields of /2/users/:id/followers.
+
+    Args:
+        profile (str): one of PROFILES.
+
+    Returns:
+        dict:
+    """
+    return dict(FOLLOWER_FIELDS[profile])
+
+
+def tweet_params(profile: str) -> dict:
+    """tweet_params.
+    fields and expansions of /2/users/:id/liked_tweets.
+
+    Args:
+        profile (str): one of PROFILES.
+
+    Returns:
+        dict:
+    """
+    return dict(TWEET_FIELDS[profile])
@@ -3,65 +3,141 @@
 Name: find_commonuser.py
 
 Compare followers lists and find same user.
+User ids are compared as sorted int64 arrays, so N lists which have
+millions of users can be compared in seconds.
+-u compares followers saved in twitter.sqlite by query instead of csvfiles.
 
-Usage: python3 find_commonuser.py -f <csv>
+Usage: python3 find_commonuser.py -f <csv> -f <csv> [-k <N>] [-m common|union|diff]
+       python3 find_commonuser.py -u <user_id> -u <user_id> [-k <N>] [-m common|union|diff]
 
 Author: Ryosuke Tomita
  Date: 2021/08/27
 """
 import argparse
+from os.path import abspath, basename
+import numpy as np
 import pandas as pd
+from storage import read_followers
+from twitter_db import TwitterDB
 
 
 def parse_args():
     """set follower list created by fetch_follower_list.py multiply."""
     parser = argparse.ArgumentParser()
-    parser.add_argument("-f", "--file", help="set follower_data.csv",
+    parser.add_argument("-f", "--file", help="set follower_data.csv or .parquet",
                         action='append', type=str)
+    parser.add_argument("-u", "--user", action='append', type=str,
+                        help="set user_id whose followers are saved in twitter.sqlite")
+    parser.add_argument("-k", "--min-lists", type=int, default=None,
+                        help="find users who appear in at least k lists. default is all lists.")
+    parser.add_argument("-m", "--mode", default="common",
+                        choices=("common", "union", "diff"),
+                        help="diff finds users only in first list.")
     p = parser.parse_args()
-    args = p.file
+    if not p.file and not p.user:
+        parser.error("-f or -u is needed.")
+    args = {"files": p.file, "user_ids": p.user, "min_lists": p.min_lists,
+            "mode": p.mode}
     return args
 
 
 def read_csv(csvfile):
-    """read follower list created by fetch_follower_list.py"""
-    df = pd.read_csv(csvfile, header=None, encoding="utf-8",
-                     usecols=(0, 1, 2, 3), names=('name', 'id', 'username', 'link'))
-    return df
-
-
-def find_min_file(df_list):
-    """compare followers list to find smallest file."""
-    min_file_size = 0
-    for df in df_list:
-        if len(df) > min_file_size:
-            min_df = df
-    return min_df
-
-
-def find_common_user(df_list, min_df):
-    """compare follower list created by fetch_follower_list.py, find common user."""
-    min_userid_set = set(min_df['id'])
-    common_user_list = []
-
-    for df in df_list:
-        # avoid compare same followers list.
-        if len(min_df['id']) == len(df['id']):
-            continue
-
-        # Judge common user, to use set() size(set cannot have same component.
-        for i in range(len(df['id'])):
-            min_userid_size_before = len(min_userid_set)
-            min_userid_set.add(df['id'][i])
-            if len(min_userid_set) == min_userid_size_before:
-                common_user_list.append(
-                    [df['name'][i], df['id'][i], df['username'][i]])
-            # After judge, destory added componet.
-            min_userid_set.remove(df['id'][i])
-
-    common_user = pd.DataFrame(data=common_user_list,
-                               index=None,
-                               columns=['name', 'id', 'username'])
+    """read follower list created by fetch_follower_list.py (csv or parquet)"""
+    return read_followers(csvfile, columns=['name', 'id', 'username'])
+
+
+def unique_ids(ids):
+    """sort ids and drop duplicated id. faster than np.unique for int64."""
+    ids = np.sort(np.asarray(ids, dtype=np.int64))
+    if len(ids) == 0:
+        return ids
+    return ids[np.concatenate(([True], ids[1:] != ids[:-1]))]
+
+
+def load_ids(df):
+    """user id of followers list as sorted unique int64 array."""
+    return unique_ids(df['id'].to_numpy(dtype=np.int64))
+
+
+def count_lists(id_arrays):
+    """the number of lists which each user id appears in."""
+    ids = np.sort(np.concatenate(id_arrays))
+    starts = np.flatnonzero(np.concatenate(([True], ids[1:] != ids[:-1])))
+    return ids[starts], np.diff(np.append(starts, len(ids)))
+
+
+def find_common_ids(id_arrays, min_lists):
+    """user ids which appear in at least min_lists lists."""
+    ids, counts = count_lists(id_arrays)
+    return ids[counts >= min_lists]
+
+
+def find_union_ids(id_arrays):
+    """user ids which appear in any list."""
+    return find_common_ids(id_arrays, 1)
+
+
+def find_diff_ids(id_arrays):
+    """user ids which appear only in first list."""
+    others = find_union_ids(id_arrays[1:]) if len(id_arrays) > 1 else []
+    return np.setdiff1d(id_arrays[0], others, assume_unique=True)
+
+
+def find_membership(ids, id_arrays):
+    """bool matrix. [i, j] is True if ids[i] appears in j th list."""
+    return np.column_stack([np.isin(ids, id_array, assume_unique=True)
+                            for id_array in id_arrays])
+
+
+def membership_names(membership, names):
+    """join list names which each user appears in. Same combination is joined once."""
+    codes = membership.astype(np.int64) @ (1 << np.arange(len(names), dtype=np.int64))
+    combinations, inverse = np.unique(codes, return_inverse=True)
+    labels = np.array([";".join(names[(code >> np.arange(len(names))) & 1 == 1])
+                       for code in combinations], dtype=object)
+    return labels[inverse]
+
+
+def find_common_user(df_list, files, mode="common", min_lists=None):
+    """compare follower list created by fetch_follower_list.py, find common user.
+    Result has the number of lists and list names which each user appears in."""
+    id_arrays = [load_ids(df) for df in df_list]
+
+    if mode == "union":
+        ids = find_union_ids(id_arrays)
+    elif mode == "diff":
+        ids = find_diff_ids(id_arrays)
+    else:
+        ids = find_common_ids(id_arrays, min_lists or len(id_arrays))
+
+    # name and username are taken from first list which has the user.
+    users = (pd.concat([df[np.isin(df['id'].to_numpy(), ids)] for df in df_list],
+                       ignore_index=True)
+             .drop_duplicates(subset='id')
+             .set_index('id')
+             .reindex(ids))
+
+    membership = find_membership(ids, id_arrays)
+    names = np.array([basename(f) for f in files])
+    common_user = pd.DataFrame({'name': users['name'].to_numpy(),
+                                'id': ids,
+                                'username': users['username'].to_numpy(),
+                                'count': membership.sum(axis=1),
+                                'lists': membership_names(membership, names)})
+    return common_user
+
+
+def find_common_user_db(db, user_ids, mode="common", min_lists=None):
+    """find_common_user() of followers saved in twitter.sqlite.
+    lists has user_ids which each user follows."""
+    if mode == "common":
+        rows = db.common_followers(user_ids, min_lists)
+    else:
+        rows = db.common_followers(user_ids, 1)
+    common_user = pd.DataFrame(rows, columns=['name', 'id', 'username',
+                                              'count', 'lists'])
+    if mode == "diff":
+        common_user = common_user[common_user['lists'] == str(int(user_ids[0]))]
     return common_user
 
 
@@ -70,23 +146,33 @@ def save_file(common_user):
     common_user["link"] = ["https://twitter.com/intent/user?user_id={}"
                            .format(i) for i in common_user['id']]
     common_user.to_csv('common_user.csv',
-                       columns=['name', 'id', 'username', 'link'],
+                       columns=['name', 'id', 'username', 'link',
+                                'count', 'lists'],
                        index=False)
 
 
 def main():
     """
-    1. Set user's lists(csv) path from stdin.
-    2. Read csv file and find minimum file.
-    3. Compare csv file and find common user.
+    1. Set user's lists(csv) path or user_ids from stdin.
+    2. Read csv file. Same file is read once.
+    3. Compare csv file and find common user. If user_ids are set, query twitter.sqlite.
     4. Save common_user to csv.
     """
-    files = parse_args()
+    args = parse_args()
+    if args['user_ids']:
+        db = TwitterDB()
+        common_user = find_common_user_db(db, args['user_ids'], args['mode'],
+                                          args['min_lists'])
+        db.close()
+        save_file(common_user)
+        return
+
+    files = list(dict.fromkeys(abspath(f) for f in args['files']))
 
     df_list = [read_csv(f) for f in files]
-    min_df = find_min_file(df_list)
 
-    common_user = find_common_user(df_list, min_df)
+    common_user = find_common_user(df_list, files, args['mode'],
+                                   args['min_lists'])
 
     save_file(common_user)
 
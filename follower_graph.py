@@ -0,0 +1,315 @@
+# coding: utf-8
+"""
+Name: follower_graph.py
+
+Follower graph of crawled users in CSR (compressed sparse row) layout.
+Every user id is mapped to node number by sorted int64 array (ids.npy).
+Followers of node i are neighbors[offsets[i]:offsets[i + 1]] (sorted
+int32 node numbers), so one edge is 4 bytes and 50 million edges are
+about 200MB. Arrays are memory-mapped, so only used rows are read.
+Graph is built from followers csv/parquet files or twitter.sqlite.
+
+Usage:
+    python3 follower_graph.py --build -f <user_id>_followers_data.csv -f <csv>
+    python3 follower_graph.py --build --db
+    python3 follower_graph.py -u <user_id> -u <user_id> [-k 20]
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+import argparse
+import os
+from os.path import basename, join
+import numpy as np
+from find_commonuser import unique_ids
+from storage import read_followers
+from twitter_db import TwitterDB
+
+GRAPH_DIR = "follower_graph"
+TOP_K = 20
+
+
+def parse_args():
+    """set followers files or db to build graph, and users to analyze."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--build", action="store_true",
+                        help="build graph from -f files or --db.")
+    parser.add_argument("-f", "--file", action='append', default=[], type=str,
+                        help="set <user_id>_followers_data.csv or .parquet")
+    parser.add_argument("--db", action="store_true",
+                        help="build graph from follows of twitter.sqlite.")
+    parser.add_argument("-u", "--user", action='append', default=[], type=str,
+                        help="set user_id to analyze.")
+    parser.add_argument("-k", "--top", type=int, default=TOP_K,
+                        help="the number of most shared followers.")
+    parser.add_argument("-d", "--dir", default=GRAPH_DIR, help="graph directory.")
+    p = parser.parse_args()
+    args = {"build": p.build, "files": p.file, "db": p.db, "user_ids": p.user,
+            "top": p.top, "dir": p.dir}
+    return args
+
+
+def count_sorted(small, large) -> int:
+    """the number of values of small which are in large. both are sorted."""
+    if len(small) > len(large):
+        small, large = large, small
+    if len(small) == 0:
+        return 0
+    positions = np.searchsorted(large, small).clip(max=len(large) - 1)
+    return int(np.count_nonzero(large[positions] == small))
+
+
+def save_array(path: str, array):
+    """write temporary file and rename it."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, mode="wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def build_graph(followers: dict, dir_path: str = GRAPH_DIR):
+    """build_graph.
+    write ids.npy, offsets.npy and neighbors.npy.
+
+    Args:
+        followers (dict): {user_id: follower ids}
+        dir_path (str): graph directory.
+
+    Returns:
+        FollowerGraph:
+    """
+    followers = {int(user_id): unique_ids(follower_ids)
+                 for user_id, follower_ids in followers.items()}
+    accounts = np.array(sorted(followers), dtype=np.int64)
+    ids = unique_ids(np.concatenate([accounts, *followers.values()]))
+    if len(ids) >= 2 ** 31:
+        raise ValueError("too many users for int32 neighbors.")
+
+    lengths = np.zeros(len(ids), dtype=np.int64)
+    lengths[np.searchsorted(ids, accounts)] = [len(followers[i]) for i in accounts]
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+
+    os.makedirs(dir_path, exist_ok=True)
+    tmp_path = join(dir_path, "neighbors.npy.tmp")
+    neighbors = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.int32,
+                                          shape=(int(offsets[-1]),))
+    for node, user_id in zip(np.searchsorted(ids, accounts), accounts):
+        # ids are sorted, so node numbers of sorted followers are sorted.
+        neighbors[offsets[node]:offsets[node + 1]] = np.searchsorted(
+            ids, followers[user_id])
+    neighbors.flush()
+    del neighbors
+    os.replace(tmp_path, join(dir_path, "neighbors.npy"))
+    save_array(join(dir_path, "offsets.npy"), offsets)
+    save_array(join(dir_path, "ids.npy"), ids)
+    return FollowerGraph(dir_path)
+
+
+def followers_of_files(files: list) -> dict:
+    """followers_of_files.
+    read follower ids of <user_id>_followers_data.csv or .parquet.
+
+    Args:
+        files (list): files
+
+    Returns:
+        dict: {user_id: follower ids}
+    """
+    followers = {}
+    for path in files:
+        user_id = int(basename(path.rstrip("/")).split("_")[0])
+        df = read_followers(path, columns=['id'])
+        followers[user_id] = df['id'].to_numpy(dtype=np.int64)
+    return followers
+
+
+def followers_of_db(db) -> dict:
+    """followers_of_db.
+    read follows of all users in twitter.sqlite.
+
+    Args:
+        db (TwitterDB): db
+
+    Returns:
+        dict: {user_id: follower ids}
+    """
+    return {user_id: np.array(db.follower_ids(user_id), dtype=np.int64)
+            for user_id in db.followed_user_ids()}
+
+
+class FollowerGraph:
+    """FollowerGraph.
+    memory-mapped CSR graph. an edge is user -> follower.
+    """
+
+    def __init__(self, dir_path: str = GRAPH_DIR):
+        """__init__.
+
+        Args:
+            dir_path (str): graph directory created by build_graph().
+        """
+        self.dir_path = dir_path
+        self.ids = np.load(join(dir_path, "ids.npy"), mmap_mode="r")
+        self.offsets = np.load(join(dir_path, "offsets.npy"), mmap_mode="r")
+        self.neighbors = np.load(join(dir_path, "neighbors.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def node(self, user_id) -> int:
+        """node.
+        node number of user_id. KeyError if user is not in graph.
+
+        Args:
+            user_id: user_id
+
+        Returns:
+            int:
+        """
+        user_id = int(user_id)
+        node = int(np.searchsorted(self.ids, user_id))
+        if node == len(self.ids) or self.ids[node] != user_id:
+            raise KeyError(user_id)
+        return node
+
+    def _row(self, node: int):
+        """follower node numbers of node (sorted)."""
+        return self.neighbors[self.offsets[node]:self.offsets[node + 1]]
+
+    def _rows(self, nodes):
+        """follower node numbers of all nodes in one array (not sorted)."""
+        starts = np.asarray(self.offsets[nodes], dtype=np.int64)
+        lengths = np.asarray(self.offsets[nodes + 1], dtype=np.int64) - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.array([], dtype=np.int32)
+        # position of each edge = start of its row + index in the row.
+        shift = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        return self.neighbors[shift + np.arange(total)]
+
+    def followers(self, user_id):
+        """followers.
+        follower ids of user_id.
+
+        Args:
+            user_id: user_id
+
+        Returns:
+            numpy.ndarray: sorted int64 ids.
+        """
+        return self.ids[self._row(self.node(user_id))]
+
+    def overlap(self, user_id1, user_id2) -> tuple:
+        """overlap.
+        the number of common followers and jaccard index of two users.
+
+        Args:
+            user_id1: user_id1
+            user_id2: user_id2
+
+        Returns:
+            tuple: (common, jaccard)
+        """
+        row1 = self._row(self.node(user_id1))
+        row2 = self._row(self.node(user_id2))
+        common = count_sorted(row1, row2)
+        union = len(row1) + len(row2) - common
+        return common, common / union if union else 0.0
+
+    def top_shared(self, user_ids: list, k: int = TOP_K) -> list:
+        """top_shared.
+        followers who follow the most users of user_ids.
+
+        Args:
+            user_ids (list): user_ids
+            k (int): the number of followers.
+
+        Returns:
+            list: [(follower id, the number of users)] sorted by the number.
+        """
+        if k <= 0:
+            return []
+        nodes = np.array([self.node(i) for i in dict.fromkeys(user_ids)],
+                         dtype=np.int64)
+        followers = np.sort(self._rows(nodes))
+        if len(followers) == 0:
+            return []
+        starts = np.flatnonzero(np.concatenate(([True], followers[1:] != followers[:-1])))
+        counts = np.diff(np.append(starts, len(followers)))
+        # larger count first, and smaller id first in same count.
+        order = -(counts << 31) + followers[starts]
+        k = min(k, len(order))
+        top = np.argpartition(order, k - 1)[:k]
+        top = top[np.argsort(order[top])]
+        return [(int(self.ids[followers[starts[i]]]), int(counts[i])) for i in top]
+
+    def reach(self, user_id, hops: int = 2) -> int:
+        """reach.
+        the number of users who are reached within hops by following
+        followers (1 hop is followers, 2 hops adds followers of followers).
+        followers of users who are not crawled are unknown.
+
+        Args:
+            user_id: user_id
+            hops (int): hops
+
+        Returns:
+            int:
+        """
+        start = self.node(user_id)
+        visited = np.zeros(len(self.ids), dtype=bool)
+        visited[start] = True
+        frontier = np.array([start], dtype=np.int64)
+        for _ in range(hops):
+            reached = self._rows(frontier)
+            reached = reached[~visited[reached]]
+            if len(reached) == 0:
+                break
+            visited[reached] = True
+            frontier = np.unique(reached).astype(np.int64)
+            # users who have no followers in graph are not expanded.
+            frontier = frontier[self.offsets[frontier + 1] > self.offsets[frontier]]
+        return int(np.count_nonzero(visited)) - 1
+
+
+def show_analysis(graph, user_ids: list, k: int):
+    """display overlap of each pair, top-k shared followers and 2-hop reach."""
+    for i, user_id1 in enumerate(user_ids):
+        for user_id2 in user_ids[i + 1:]:
+            common, jaccard = graph.overlap(user_id1, user_id2)
+            print("{} {}: common {} jaccard {:.4f}".format(
+                user_id1, user_id2, common, jaccard))
+    if len(user_ids) > 1:
+        print("top {} shared followers:".format(k))
+        for follower_id, count in graph.top_shared(user_ids, k):
+            print("    {} {}".format(follower_id, count))
+    for user_id in user_ids:
+        print("{}: followers {} 2-hop reach {}".format(
+            user_id, len(graph.followers(user_id)), graph.reach(user_id, 2)))
+
+
+def main():
+    """
+    1. Set followers files or db, and user_ids from stdin.
+    2. If --build is set, build graph from files or twitter.sqlite.
+    3. Display overlap, shared followers and reach of user_ids.
+    """
+    args = parse_args()
+    if args['build']:
+        if args['db']:
+            db = TwitterDB()
+            followers = followers_of_db(db)
+            db.close()
+        else:
+            followers = followers_of_files(args['files'])
+        graph = build_graph(followers, args['dir'])
+        print("{} users, {} edges.".format(len(graph), len(graph.neighbors)))
+    else:
+        graph = FollowerGraph(args['dir'])
+
+    if args['user_ids']:
+        show_analysis(graph, args['user_ids'], args['top'])
+
+
+if __name__ == "__main__":
+    main()
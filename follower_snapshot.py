@@ -0,0 +1,128 @@
+# coding: utf-8
+"""
+Name: follower_snapshot.py
+
+Save follower ids of each crawl as snapshot, and find followers who
+followed or unfollowed since last snapshot.
+Snapshot is int64 array in API order (newest follower first), saved to
+<user_id>_followers_snapshots/<time>.npy.
+Because new followers come first, crawl can stop when it reaches a run
+of followers which are already in last snapshot. Then followers after
+the run are taken from last snapshot (unfollows there are found by full crawl).
+
+Usage:
+    store = SnapshotStore(user_id)
+    gained, lost, snapshot = diff_snapshot(store.latest(), fetched_ids, complete)
+    store.save(snapshot, taken_at)
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+import glob
+import os
+from os.path import join
+import numpy as np
+
+# stop crawl when this number of known followers come in a row.
+STOP_RUN = 500
+
+
+class SnapshotStore:
+    """SnapshotStore.
+    snapshots of a user. file name is crawl time, so the last file is the latest.
+    """
+
+    def __init__(self, user_id: str, dir_path: str = None):
+        """__init__.
+
+        Args:
+            user_id (str): user_id
+            dir_path (str): directory of snapshots.
+        """
+        self.dir_path = dir_path or user_id + "_followers_snapshots"
+
+    def paths(self) -> list:
+        """paths.
+        snapshot files sorted by time.
+
+        Returns:
+            list:
+        """
+        return sorted(glob.glob(join(self.dir_path, "*.npy")))
+
+    def latest(self):
+        """latest.
+        follower ids of the latest snapshot. None if there is no snapshot.
+
+        Returns:
+            numpy.ndarray:
+        """
+        paths = self.paths()
+        if not paths:
+            return None
+        return np.load(paths[-1])
+
+    def save(self, ids, taken_at: str) -> str:
+        """save.
+        write temporary file and rename it.
+
+        Args:
+            ids (numpy.ndarray): follower ids, newest first.
+            taken_at (str): crawl time. 2026-10-18T00:00:00Z
+
+        Returns:
+            str: snapshot path.
+        """
+        os.makedirs(self.dir_path, exist_ok=True)
+        path = join(self.dir_path, taken_at.replace("-", "").replace(":", "") + ".npy")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, mode="wb") as f:
+            np.save(f, np.asarray(ids, dtype=np.int64))
+        os.replace(tmp_path, path)
+        return path
+
+
+def known_run(run: int, known) -> int:
+    """known_run.
+    the number of known followers in a row at the end of fetched pages.
+
+    Args:
+        run (int): run until last page.
+        known (numpy.ndarray): bool array. True if follower of page is in last snapshot.
+
+    Returns:
+        int:
+    """
+    unknown = np.flatnonzero(~known)
+    if len(unknown) == 0:
+        return run + len(known)
+    return len(known) - unknown[-1] - 1
+
+
+def diff_snapshot(previous, fetched, complete: bool) -> tuple:
+    """diff_snapshot.
+    compare fetched follower ids with last snapshot.
+
+    Args:
+        previous (numpy.ndarray): last snapshot. None if there is no snapshot.
+        fetched (numpy.ndarray): follower ids fetched by this crawl, newest first.
+        complete (bool): False if crawl stopped at known followers.
+
+    Returns:
+        tuple: (gained ids, lost ids, new snapshot)
+    """
+    fetched = np.asarray(fetched, dtype=np.int64)
+    empty = np.array([], dtype=np.int64)
+    if previous is None:
+        return empty, empty, fetched
+    if complete or len(fetched) == 0:
+        covered, tail = previous, empty
+    else:
+        # followers after last fetched one are not changed.
+        end = np.flatnonzero(previous == fetched[-1])[0] + 1
+        covered, tail = previous[:end], previous[end:]
+        tail = tail[~np.isin(tail, fetched)]
+
+    gained = fetched[~np.isin(fetched, previous)]
+    lost = covered[~np.isin(covered, fetched)]
+    return gained, lost, np.concatenate((fetched, tail))
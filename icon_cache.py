@@ -0,0 +1,132 @@
+# coding: utf-8
+"""
+Name: icon_cache.py
+
+Cache of downloaded icons.
+Icon image is saved once by its sha256 in <icon dir>/.objects/ and
+<icon dir>/<user_id> is hard link to it, so same images are saved once.
+<icon dir>/.cache.sqlite keeps profile_image_url, ETag and Last-Modified
+of each user. If url is not changed, icon is not downloaded again.
+
+Usage:
+    cache = IconCache("icon/")
+    entry = cache.get(user_id)
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+import hashlib
+import os
+from os.path import exists, join
+import shutil
+import sqlite3
+import threading
+
+
+class IconCache:
+    """IconCache.
+    user_id -> (profile_image_url, ETag, Last-Modified, sha256).
+    """
+
+    def __init__(self, dir_path: str):
+        """__init__.
+
+        Args:
+            dir_path (str): directory to save icons.
+        """
+        self.dir_path = dir_path
+        self.objects_path = join(dir_path, ".objects")
+        os.makedirs(self.objects_path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(join(dir_path, ".cache.sqlite"),
+                                   check_same_thread=False)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS icons (
+                            user_id TEXT PRIMARY KEY, url TEXT,
+                            etag TEXT, last_modified TEXT, sha256 TEXT)""")
+        self._db.commit()
+
+    def get(self, user_id: str) -> dict:
+        """get.
+        If user is not cached or cached image is removed, return None.
+
+        Args:
+            user_id (str): user_id
+
+        Returns:
+            dict:
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, etag, last_modified, sha256 FROM icons"
+                " WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None or not exists(join(self.objects_path, row[3])):
+            return None
+        return {"url": row[0], "etag": row[1], "last_modified": row[2],
+                "sha256": row[3]}
+
+    @staticmethod
+    def conditional_headers(entry: dict) -> dict:
+        """conditional_headers.
+        If-None-Match and If-Modified-Since from cached entry.
+
+        Args:
+            entry (dict): entry
+
+        Returns:
+            dict:
+        """
+        headers = {}
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, user_id: str, url: str, content: bytes,
+              etag: str = None, last_modified: str = None):
+        """store.
+        save image by sha256 and link it to <icon dir>/<user_id>.
+
+        Args:
+            user_id (str): user_id
+            url (str): profile_image_url
+            content (bytes): image
+            etag (str): ETag header
+            last_modified (str): Last-Modified header
+        """
+        sha256 = hashlib.sha256(content).hexdigest()
+        object_path = join(self.objects_path, sha256)
+        if not exists(object_path):
+            tmp_path = "{}.{}.tmp".format(object_path, threading.get_ident())
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, object_path)
+        self.link(user_id, sha256)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO icons VALUES (?, ?, ?, ?, ?)",
+                (user_id, url, etag, last_modified, sha256))
+            self._db.commit()
+
+    def link(self, user_id: str, sha256: str):
+        """link.
+        make <icon dir>/<user_id> point to cached image.
+
+        Args:
+            user_id (str): user_id
+            sha256 (str): sha256 of image
+        """
+        object_path = join(self.objects_path, sha256)
+        icon_path = join(self.dir_path, str(user_id))
+        if exists(icon_path) and os.path.samefile(icon_path, object_path):
+            return
+        tmp_path = "{}.{}.tmp".format(icon_path, threading.get_ident())
+        try:
+            os.link(object_path, tmp_path)
+        except OSError:
+            shutil.copyfile(object_path, tmp_path)
+        os.replace(tmp_path, icon_path)
+
+    def close(self):
+        """close."""
+        self._db.close()
@@ -0,0 +1,129 @@
+# coding: utf-8
+"""
+Name: icon_downloader.py
+
+Download icon images by worker threads.
+Icon CDN is not limited by Twitter API rate limit, so icons are
+downloaded while main thread waits for API rate limit.
+submit() blocks when queue is full, so memory is bounded.
+If IconCache is given, unchanged icons are not downloaded again.
+
+Usage:
+    with IconDownloader(client, "icon/", workers=8) as downloader:
+        downloader.submit(icon_src, user_id)
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+from os.path import join
+import threading
+
+WORKERS = 8
+
+
+class IconDownloader:
+    """IconDownloader.
+    bounded thread pool to download icons.
+    """
+
+    def __init__(self, client, dir_path: str, workers: int = WORKERS,
+                 queue_size: int = None, cache=None, revalidate: bool = False):
+        """__init__.
+
+        Args:
+            client (TwitterClient): client. pool_size should be >= workers.
+            dir_path (str): directory to save icons.
+            workers (int): the number of download threads.
+            queue_size (int): max icons waiting for download. default is workers*4.
+            cache (IconCache): cache
+            revalidate (bool): send conditional request even if url is not changed.
+        """
+        self.client = client
+        self.dir_path = dir_path
+        self.cache = cache
+        self.revalidate = revalidate
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.slots = threading.BoundedSemaphore(queue_size or workers*4)
+        self.results = {"downloaded": 0, "cached": 0, "not_modified": 0,
+                        "failed": 0}
+        self._lock = threading.Lock()
+        os.makedirs(dir_path, exist_ok=True)
+
+    def submit(self, icon_src: str, user_id: str):
+        """submit.
+        add icon to download queue. If queue is full, wait until a slot is free.
+
+        Args:
+            icon_src (str): icon url.
+            user_id (str): user_id is used as file name.
+        """
+        self.slots.acquire()
+        future = self.executor.submit(self.img_dl, icon_src, user_id)
+        future.add_done_callback(self._done)
+
+    def img_dl(self, icon_src: str, user_id: str) -> str:
+        """img_dl.
+        From user's icon url, download image.
+
+        Args:
+            icon_src (str): icon_src
+            user_id (str): user_id
+
+        Returns:
+            str: downloaded, cached or not_modified.
+        """
+        entry = self.cache.get(user_id) if self.cache is not None else None
+        headers = {}
+        if entry is not None and entry['url'] == icon_src:
+            if not self.revalidate:
+                self.cache.link(user_id, entry['sha256'])
+                return "cached"
+            headers = self.cache.conditional_headers(entry)
+
+        response = self.client.download(icon_src, headers=headers)
+        if response.status_code == 304:
+            self.cache.link(user_id, entry['sha256'])
+            return "not_modified"
+        if response.status_code != 200:
+            raise Exception("Request returned an error: {} {}".format(
+                response.status_code, icon_src))
+
+        if self.cache is not None:
+            self.cache.store(user_id, icon_src, response.content,
+                             response.headers.get('ETag'),
+                             response.headers.get('Last-Modified'))
+        else:
+            with open(join(self.dir_path, str(user_id)), "wb") as f:
+                f.write(response.content)
+        return "downloaded"
+
+    def _done(self, future):
+        """_done.
+        free queue slot and count result.
+        """
+        self.slots.release()
+        error = future.exception()
+        with self._lock:
+            if error is None:
+                self.results[future.result()] += 1
+            else:
+                self.results["failed"] += 1
+        if error is not None:
+            print(error)
+
+    def close(self):
+        """close.
+        wait until all icons are downloaded.
+        """
+        self.executor.shutdown(wait=True)
+        print("{downloaded} icons downloaded, {cached} cached, "
+              "{not_modified} not modified, {failed} failed."
+              .format(**self.results))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
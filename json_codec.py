@@ -0,0 +1,63 @@
+# coding: utf-8
+"""
+Name: json_codec.py
+
+Decode API responses by the fastest installed JSON library.
+orjson is used if it is installed, then msgspec, otherwise json module.
+All of them return same dict and list, so callers are not changed.
+Response body (bytes) is decoded directly, without decoding it to str
+first as response.json() does.
+
+Usage:
+    json_res = response_json(response)
+    tweet = loads(line)
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def select_loads(backend: str = None):
+    """select_loads.
+    loads function of backend. If backend is None, the fastest installed one.
+
+    Args:
+        backend (str): "orjson", "msgspec" or "json".
+
+    Returns:
+        tuple: (backend name, loads function)
+    """
+    if backend in (None, "orjson") and orjson is not None:
+        return "orjson", orjson.loads
+    if backend in (None, "msgspec") and msgspec is not None:
+        return "msgspec", msgspec.json.decode
+    if backend not in (None, "json"):
+        raise ImportError("{} is not installed.".format(backend))
+    return "json", json.loads
+
+
+BACKEND, loads = select_loads()
+
+
+def response_json(response):
+    """response_json.
+    decode body of requests.Response (or async_client.Response).
+
+    Args:
+        response: response
+
+    Returns:
+        dict or list:
+    """
+    return loads(response.content)
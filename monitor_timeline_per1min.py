@@ -3,8 +3,17 @@
 Name: monitor_timeline_per1min.py
 
 Using Twitter API fetch follower list.
+Monitor timelines of watchlist users. Each poll fetches only tweets newer
+than saved since_id, and users are polled by their tweet frequency
+(see timeline_schedule.py).
 
-Usage: python3 monitor_timeline_per1min.py -i <user_id>
+--stream receives tweets by filtered stream instead of polling
+(see tweet_stream.py).
+
+Usage:
+    python3 monitor_timeline_per1min.py -i <user_id>
+    python3 monitor_timeline_per1min.py -w <watchlist>
+    python3 monitor_timeline_per1min.py -w <watchlist> --stream
 
 Author: Ryosuke Tomita
 Date: 2021/08/26
@@ -15,18 +24,49 @@ from os.path import abspath, join, dirname
 import time
 import random
 import shutil
-import requests
+from credentials import load_token_pool
+from csv_sink import SinkPool
+from json_codec import response_json
+from seen_ids import CAPACITY, SEEN_FILE, SeenIds
+from timeline_schedule import REQUESTS_PER_WINDOW, SAVE_INTERVAL, TimelineSchedule
+from tweet_stream import API_URL, keep_streaming
+from twitter_client import TwitterClient
+from twitter_db import TwitterDB
+
+# first poll of user fetches only latest tweets.
+FIRST_RESULTS = 5
+MAX_RESULTS = 100
 
 
 def parse_args():
     """set target user_id from stdin."""
     parser = argparse.ArgumentParser()
-    parser.add_argument("-i", "--userid", help="userid", type=str)
+    parser.add_argument("-i", "--userid", help="userid", action='append',
+                        type=str, default=[])
+    parser.add_argument("-w", "--watchlist", type=str,
+                        help="file which has user_id per line")
+    parser.add_argument("--seen-size", type=int, default=CAPACITY,
+                        help="the number of saved tweet ids remembered to skip duplicates")
+    parser.add_argument("--stream", action="store_true",
+                        help="receive tweets by filtered stream instead of polling")
+    parser.add_argument("--api-url", type=str, default=API_URL,
+                        help="api url of stream mode (e.g. mock server)")
     p = parser.parse_args()
-    args = {"userid": p.userid}
+    if not p.userid and not p.watchlist:
+        parser.error("-i or -w is needed.")
+    args = {"userids": p.userid, "watchlist": p.watchlist,
+            "seen_size": p.seen_size, "stream": p.stream,
+            "api_url": p.api_url}
     return args
 
 
+def read_watchlist(watchlist):
+    """user_id per line. '#' starts comment."""
+    with open(watchlist, mode="r") as f:
+        user_ids = [line.split("#")[0].strip() for line in f]
+    return [user_id for user_id in user_ids if user_id]
+
+
 def load_bearer_token():
     """BEARER_TOKEN is exported by .bashrc"""
     return os.getenv("BEARER_TOKEN")
@@ -41,9 +81,13 @@ def create_url(user_id, tweet_type):
     return url
 
 
-def create_params():
-    """max_results can be chose between 5~100"""
-    return {"tweet.fields": "created_at", 'max_results': '5'}
+def create_params(since_id=None):
+    """max_results can be chose between 5~100.
+    If since_id is set, only newer tweets are fetched."""
+    if since_id is None:
+        return {"tweet.fields": "created_at", 'max_results': str(FIRST_RESULTS)}
+    return {"tweet.fields": "created_at", 'max_results': str(MAX_RESULTS),
+            "since_id": since_id}
 
 
 def random_user_agent():
@@ -63,76 +107,143 @@ def create_headers(bearer_token):
     return headers
 
 
-def fetch_user_timeline(url, payload, headers):
-    """If find not saved tweets(new tweets) save to file."""
-    response = requests.get(url, params=payload, headers=headers)
+def fetch_new_tweets(url, client, since_id):
+    """fetch all tweets newer than since_id. If many tweets are posted,
+    next pages are fetched. First poll (since_id is None) fetches one page."""
+    payload = create_params(since_id)
+    tweets = []
+    while True:
+        response = client.get(url, params=payload)
+        if response.status_code != 200:
+            raise Exception(
+                "Request returned an error: {} {}".format(
+                    response.status_code, response.text
+                )
+            )
+        json_res = response_json(response)
+        tweets.extend(json_res.get('data', []))
+        next_token = json_res.get('meta', {}).get('next_token')
+        if since_id is None or next_token is None:
+            return tweets
+        payload.update(pagination_token=next_token)
 
-    # When api rate limits, sleep.
-    if response.status_code == 429:
-        time.sleep(60)
-        return fetch_user_timeline(url, payload, headers)
 
-    json_res = response.json()
+def create_csv_name(user_id):
+    """csvfile name contains target user_id."""
+    return user_id + '_' + 'timeline_data.csv'
 
-    # display requests error message.
-    if response.status_code != 200:
-        raise Exception(
-            "Request returned an error: {} {}".format(
-                response.status_code, response.text
-            )
-        )
-    return json_res['data']
 
+def save_file(tweet_json, user_id, sinks):
+    """save user tweet to csv. csvfile is kept open by sinks."""
+    sinks.get(create_csv_name(user_id)).write_rows([
+        [tweet_json['id'], tweet_json['text'],
+         "https://twitter.com/" + user_id + "/status/" + tweet_json['id']]])
 
-def save_file(tweet_json, user_id):
-    """save user tweet to csv."""
-    save_file = (user_id + '_' + 'timeline_data.csv')
-    with open(save_file, mode="a") as f:
-        f.write("{0},{1},https://twitter.com/{2}/status/{0}\n".format(
-            tweet_json['id'], tweet_json['text'], user_id))
 
+def show_tweet(tweet, user_id, sinks):
+    """print new tweet and save to file."""
+    print("{}: {}\n{}".format(user_id, tweet['text'],
+                              "="*shutil.get_terminal_size().columns))
+    save_file(tweet, user_id, sinks)
+
+
+def show_stream_tweet(tweet, sinks, db):
+    """print tweet of stream and save to file and db."""
+    show_tweet(tweet, tweet['author_id'], sinks)
+    db.add_tweets([tweet])
 
-def keep_monitoring(url, payload, headers, user_id):
-    """continue to scanning target user timeline per 1min."""
-    id_list = []
-    while True:
-        print("-----Scanning Target Tweet.-----")
-        new_tweets_json = fetch_user_timeline(url, payload, headers)
-        new_tweet_exist = False
 
-        # If new tweets are exist,prind stdin and save to file.
-        for tweet in new_tweets_json:
-            if tweet['id'] not in id_list:
-                id_list.append(tweet['id'])
-                print("{}\n{}".format(tweet['text'],
-                                      "="*shutil.get_terminal_size().columns))
-                save_file(tweet, user_id)
-                new_tweet_exist = True
+def save_new_tweets(new_tweets_json, user_id, schedule, seen, sinks, db=None):
+    """save tweets of one poll which are not seen, and update since_id of user."""
+    # If new tweets are exist,prind stdin and save to file. oldest first.
+    new_tweets = []
+    for tweet in reversed(new_tweets_json):
+        if seen.add(tweet['id']):
+            show_tweet(tweet, user_id, sinks)
+            new_tweets.append(tweet)
+    if db is not None and new_tweets:
+        db.add_tweets(new_tweets, user_id)
 
-        if not new_tweet_exist:
-            print("-----No new Tweet------")
+    newest_id = max((tweet['id'] for tweet in new_tweets_json),
+                    key=int, default=None)
+    schedule.done(user_id, len(new_tweets), newest_id)
 
-        print("-----Next Scan is 60s later.------")
-        time.sleep(60)
+
+def keep_monitoring(schedule, client, seen, sinks, db=None):
+    """continue to scanning timelines of watchlist users.
+    Next user is polled when its time comes. Saved tweets are written
+    to files before sleeping. If db is set, new tweets of each poll are
+    saved to db in one transaction."""
+    saved = time.time()
+    while True:
+        user_id, wait_time = schedule.next()
+        if wait_time > 0:
+            sinks.flush()
+            time.sleep(wait_time)
+        url = create_url(user_id, "normal")
+        try:
+            new_tweets_json = fetch_new_tweets(url, client,
+                                               schedule.since_id(user_id))
+        except Exception as error:
+            print("-----{}: {}-----".format(user_id, error))
+            schedule.done(user_id, 0)
+            continue
+
+        save_new_tweets(new_tweets_json, user_id, schedule, seen, sinks, db)
+        if time.time() - saved >= SAVE_INTERVAL:
+            sinks.flush()
+            seen.save()
+            saved = time.time()
 
 
 def main():
     """
-    1. Set target userid from stdin.
-    2. Load token and create url, payload, headers.
-    3. Scan target user's timeline per 1min. If new tweets are exist, save to csvfile.
+    1. Set target userid or watchlist from stdin.
+    2. Load token and create headers.
+    3. If --stream is set, receive tweets of watchlist users by filtered stream.
+    4. Otherwise scan timelines of watchlist users. Users are polled by their
+       tweet frequency within rate limit. If new tweets are exist, save to csvfile
+       and twitter.sqlite.
     """
     args = parse_args()
-    user_id = args['userid']
+    user_ids = list(args['userids'])
+    if args['watchlist']:
+        user_ids += read_watchlist(args['watchlist'])
+    if not user_ids:
+        raise SystemExit("no user_id in {}.".format(args['watchlist']))
 
     bearer_token = load_bearer_token()
-    #tweet_type = "mention"
-    tweet_type = "normal"
-    url = create_url(user_id, tweet_type)
-    payload = create_params()
-    headers = create_headers(bearer_token)
-
-    keep_monitoring(url, payload, headers, user_id)
+    token_pool = load_token_pool()
+    seen = SeenIds(args['seen_size'], SEEN_FILE)
+    db = TwitterDB()
+
+    if args['stream']:
+        # stream is read by requests session.
+        client = TwitterClient(create_headers(bearer_token), http2=False,
+                               token_pool=token_pool)
+        # each tweet is written as soon as it arrives.
+        sinks = SinkPool(flush_rows=1)
+        try:
+            keep_streaming(user_ids, client, seen,
+                           lambda tweet: show_stream_tweet(tweet, sinks, db),
+                           api_url=args['api_url'])
+        finally:
+            sinks.close()
+            seen.save()
+            db.close()
+        return
+
+    client = TwitterClient(create_headers(bearer_token), token_pool=token_pool)
+    schedule = TimelineSchedule(
+        user_ids, budget=REQUESTS_PER_WINDOW * len(token_pool.tokens))
+    sinks = SinkPool()
+    try:
+        keep_monitoring(schedule, client, seen, sinks, db)
+    finally:
+        sinks.close()
+        seen.save()
+        schedule.save()
+        db.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,169 @@
+# coding: utf-8
+"""
+Name: profile_cache.py
+
+Cache of user profiles (followers_count, profile_image_url etc.).
+Recently used profiles are kept in memory (LRU), and all profiles are
+saved to users table of twitter.sqlite, so they are shared by all
+scripts and kept after exit. Profiles older than ttl seconds are
+fetched again by users/lookup (100 users per request).
+Age is checked per fields group (metrics, icon url), so page which has
+only metrics doesn't make old icon url fresh.
+Followers pages saved by TwitterDB.add_followers() also fill the cache.
+
+Usage:
+    cache = ProfileCache()
+    profile = cache.profile(client, user_id)
+    profiles = cache.lookup(client, user_ids, fields=("profile_image_url",))
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+from collections import OrderedDict
+import threading
+import time
+from twitter_db import TwitterDB, is_fresh
+from user_lookup import LOOKUP_SIZE, chunked, lookup_users
+
+# profile saved within 1 day is used.
+TTL = 24 * 60 * 60
+MAX_SIZE = 100000
+
+
+class ProfileCache:
+    """ProfileCache.
+    user_id -> profile dict (keys are twitter_db.USER_COLUMNS).
+    """
+
+    def __init__(self, db: TwitterDB = None, ttl: float = TTL,
+                 max_size: int = MAX_SIZE):
+        """__init__.
+
+        Args:
+            db (TwitterDB): db. If it is None, twitter.sqlite is opened.
+            ttl (float): seconds while profile is used.
+            max_size (int): the number of profiles kept in memory.
+        """
+        self._own_db = db is None
+        self.db = db or TwitterDB()
+        self.ttl = ttl
+        self.max_size = max_size
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, profile: dict):
+        """_remember.
+        keep profile in memory. least recently used profile is dropped.
+        """
+        with self._lock:
+            self._profiles[profile['id']] = profile
+            self._profiles.move_to_end(profile['id'])
+            if len(self._profiles) > self.max_size:
+                self._profiles.popitem(last=False)
+
+    def _memory(self, user_id: int, ttl: float, fields: tuple):
+        """_memory.
+        fresh profile in memory which has fields, or None.
+        """
+        with self._lock:
+            profile = self._profiles.get(user_id)
+            if profile is None:
+                return None
+            self._profiles.move_to_end(user_id)
+        if not is_fresh(profile, fields, time.time() - ttl):
+            return None
+        return profile
+
+    def put(self, users: list) -> dict:
+        """put.
+        save fetched user objects (v1.1 or v2). Saved rows are read again,
+        so profiles in memory are same as users table.
+
+        Args:
+            users (list): user objects.
+
+        Returns:
+            dict: {user_id (int): profile}
+        """
+        self.db.upsert_users(users)
+        profiles = {}
+        for profile in self.db.users(int(user.get('id_str') or user['id'])
+                                     for user in users):
+            self._remember(profile)
+            profiles[profile['id']] = profile
+        return profiles
+
+    def get(self, user_ids, ttl: float = None, fields: tuple = ()) -> dict:
+        """get.
+        cached profiles. API is not called.
+
+        Args:
+            user_ids: user_ids
+            ttl (float): seconds. default is self.ttl.
+            fields (tuple): profile which doesn't have these fields is not used.
+
+        Returns:
+            dict: {user_id (int): profile}
+        """
+        ttl = self.ttl if ttl is None else ttl
+        profiles = {}
+        missing = []
+        for user_id in dict.fromkeys(int(i) for i in user_ids):
+            profile = self._memory(user_id, ttl, fields)
+            if profile is None:
+                missing.append(user_id)
+            else:
+                profiles[user_id] = profile
+        for profile in self.db.users(missing, ttl, fields):
+            self._remember(profile)
+            profiles[profile['id']] = profile
+        self.hits += len(profiles)
+        return profiles
+
+    def lookup(self, client, user_ids, ttl: float = None, fields: tuple = (),
+               on_wait=None) -> dict:
+        """lookup.
+        profiles of user_ids. Only users which are not cached are fetched.
+        Suspended or deleted users are not contained in result.
+
+        Args:
+            client (TwitterClient): client
+            user_ids: user_ids
+            ttl (float): seconds. default is self.ttl.
+            fields (tuple): profile which doesn't have these fields is fetched.
+            on_wait: called before sleeping until rate limit is reset.
+
+        Returns:
+            dict: {user_id (int): profile}
+        """
+        user_ids = list(dict.fromkeys(int(i) for i in user_ids))
+        profiles = self.get(user_ids, ttl, fields)
+        missing = [i for i in user_ids if i not in profiles]
+        self.misses += len(missing)
+        for users in chunked(lookup_users(client, missing, on_wait), LOOKUP_SIZE):
+            profiles.update(self.put(users))
+        return profiles
+
+    def profile(self, client, user_id, fields: tuple = ()) -> dict:
+        """profile.
+        profile of one user. Exception is raised if user is not found.
+
+        Args:
+            client (TwitterClient): client
+            user_id: user_id
+            fields (tuple): fields
+
+        Returns:
+            dict:
+        """
+        profile = self.lookup(client, [user_id], fields=fields).get(int(user_id))
+        if profile is None:
+            raise Exception("user {} is not found.".format(user_id))
+        return profile
+
+    def close(self):
+        """close. db is closed if it is opened by this cache."""
+        if self._own_db:
+            self.db.close()
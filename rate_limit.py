@@ -0,0 +1,178 @@
+# coding: utf-8
+"""
+Name: rate_limit.py
+
+Pace Twitter API requests by x-rate-limit-* response headers.
+Each endpoint has its own token bucket. Request is sent while quota remains
+and sleep only until the real x-rate-limit-reset time.
+
+Usage:
+    rate_limiter = RateLimiter()
+    rate_limiter.wait(url)
+    response = requests.get(url, params=payload, headers=headers)
+    rate_limiter.update(url, response)
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+# When 429 is returned without future x-rate-limit-reset, wait one window.
+DEFAULT_WINDOW = 60*15
+
+
+def endpoint_key(url: str) -> str:
+    """endpoint_key.
+    Rate limit is shared per endpoint, so replace user_id in url path.
+    /2/users/123/followers -> /2/users/:id/followers
+
+    Args:
+        url (str): url
+
+    Returns:
+        str:
+    """
+    version, _, path = urlparse(url).path.lstrip("/").partition("/")
+    return "/{}/{}".format(version, re.sub(r"(^|/)\d+(?=/|$)", r"\1:id", path))
+
+
+class RateLimiter:
+    """RateLimiter.
+    token bucket per endpoint. remaining and reset are updated by response headers.
+    """
+
+    def __init__(self, margin: float = 1.0, smooth: bool = False):
+        """__init__.
+
+        Args:
+            margin (float): seconds added to reset time to absorb clock skew.
+            smooth (bool): spread remaining requests evenly until reset.
+        """
+        self.margin = margin
+        self.smooth = smooth
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def update(self, url: str, response):
+        """update.
+        read x-rate-limit-limit, x-rate-limit-remaining, x-rate-limit-reset.
+
+        Args:
+            url (str): url
+            response: response
+        """
+        key = endpoint_key(url)
+        headers = response.headers
+        try:
+            remaining = int(headers['x-rate-limit-remaining'])
+            reset = float(headers['x-rate-limit-reset'])
+        except (KeyError, TypeError, ValueError):
+            if response.status_code != 429:
+                return
+            remaining = 0
+            reset = time.time() + DEFAULT_WINDOW
+        limit = int(headers.get('x-rate-limit-limit', remaining) or remaining)
+
+        if response.status_code == 429:
+            remaining = 0
+            # reset is already past (clock skew or stale headers). wait one window
+            # instead of sending again at once.
+            if reset <= time.time():
+                reset = time.time() + DEFAULT_WINDOW
+
+        with self._lock:
+            bucket = self._buckets.setdefault(key, {"last": 0.0})
+            bucket.update(limit=limit, remaining=remaining, reset=reset)
+
+    def wait_time(self, url: str) -> float:
+        """wait_time.
+        seconds to wait before next request to url. 0 means request can be sent.
+
+        Args:
+            url (str): url
+
+        Returns:
+            float:
+        """
+        with self._lock:
+            return self._wait_time(self._buckets.get(endpoint_key(url)),
+                                    time.time())
+
+    def remaining(self, url: str) -> float:
+        """remaining.
+        the number of requests which can be sent until reset.
+        If headers are not received yet or window is reset, return inf.
+
+        Args:
+            url (str): url
+
+        Returns:
+            float:
+        """
+        with self._lock:
+            bucket = self._buckets.get(endpoint_key(url))
+            if bucket is None or time.time() >= bucket['reset']:
+                return float("inf")
+            return bucket['remaining']
+
+    def acquire(self, url: str) -> float:
+        """acquire.
+        consume one token if quota is available. Otherwise return seconds to wait.
+        It never sleeps, so asyncio tasks can wait by asyncio.sleep().
+
+        Args:
+            url (str): url
+
+        Returns:
+            float: 0 if token is consumed.
+        """
+        with self._lock:
+            bucket = self._buckets.get(endpoint_key(url))
+            now = time.time()
+            wait_time = self._wait_time(bucket, now)
+            if wait_time <= 0 and bucket is not None:
+                self._consume(bucket, now)
+            return max(0.0, wait_time)
+
+    def wait(self, url: str) -> float:
+        """wait.
+        sleep until quota is available, then consume one token.
+
+        Args:
+            url (str): url
+
+        Returns:
+            float: slept seconds.
+        """
+        slept = 0.0
+        while True:
+            wait_time = self.acquire(url)
+            if wait_time <= 0:
+                return slept
+            time.sleep(wait_time)
+            slept += wait_time
+
+    def _wait_time(self, bucket: dict, now: float) -> float:
+        """_wait_time."""
+        if bucket is None or now >= bucket['reset']:
+            return 0.0
+        if bucket['remaining'] <= 0:
+            return bucket['reset'] - now + self.margin
+        if self.smooth:
+            interval = (bucket['reset'] - now) / bucket['remaining']
+            return max(0.0, bucket['last'] + interval - now)
+        return 0.0
+
+    @staticmethod
+    def _consume(bucket: dict, now: float):
+        """_consume.
+        After reset, bucket is refilled up to limit until next headers arrive.
+        """
+        if now >= bucket['reset']:
+            bucket['remaining'] = bucket['limit']
+            bucket['reset'] = now + DEFAULT_WINDOW
+        bucket['remaining'] -= 1
+        bucket['last'] = now
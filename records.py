@@ -0,0 +1,242 @@
+# coding: utf-8
+"""
+Name: records.py
+
+Compact records of users and tweets.
+User and Tweet have __slots__, so a record has no __dict__.
+UserBatch and TweetBatch keep a page (or many pages) by column: ids are
+int64 array('q') (8 bytes per id) and text columns are lists of str.
+Repeated strings (lang) are interned, so they are kept once.
+id_array() is numpy view of ids, so ids are passed to parquet writer
+and numpy without copy.
+
+Usage:
+    batch = UserBatch.from_json(json_res['data'])
+    sink.write_rows(batch.csv_rows())
+    ids = batch.id_array()
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+from array import array
+import sys
+import numpy as np
+
+FOLLOWER_LINK = "https://twitter.com/intent/user?user_id="
+# author_id of tweet whose author is unknown.
+UNKNOWN_ID = 0
+
+
+def intern(value):
+    """intern str. None is returned as it is."""
+    return None if value is None else sys.intern(value)
+
+
+class User:
+    """User.
+    id is int. created_at is str (2021-10-01T04:26:15.000Z) or None.
+    """
+    __slots__ = ("id", "name", "username", "created_at")
+
+    def __init__(self, id: int, name: str, username: str, created_at: str = None):
+        """__init__.
+
+        Args:
+            id (int): id
+            name (str): name
+            username (str): username
+            created_at (str): created_at
+        """
+        self.id = id
+        self.name = name
+        self.username = username
+        self.created_at = created_at
+
+    @classmethod
+    def from_json(cls, user: dict):
+        """v2 user object to User."""
+        return cls(int(user['id']), user['name'], user['username'],
+                   user.get('created_at'))
+
+    def __repr__(self):
+        return "User({}, {!r}, {!r})".format(self.id, self.name, self.username)
+
+
+class Tweet:
+    """Tweet.
+    id and author_id are int. author_id is UNKNOWN_ID if it is not fetched.
+    """
+    __slots__ = ("id", "text", "author_id", "lang", "created_at")
+
+    def __init__(self, id: int, text: str, author_id: int = UNKNOWN_ID,
+                 lang: str = None, created_at: str = None):
+        """__init__.
+
+        Args:
+            id (int): id
+            text (str): text
+            author_id (int): author_id
+            lang (str): lang
+            created_at (str): created_at
+        """
+        self.id = id
+        self.text = text
+        self.author_id = author_id
+        self.lang = lang
+        self.created_at = created_at
+
+    @classmethod
+    def from_json(cls, tweet: dict, author_id=None):
+        """v2 tweet object to Tweet. author_id is used if tweet doesn't have it."""
+        author_id = tweet.get('author_id', author_id)
+        return cls(int(tweet['id']), tweet['text'],
+                   UNKNOWN_ID if author_id is None else int(author_id),
+                   intern(tweet.get('lang')), tweet.get('created_at'))
+
+    def __repr__(self):
+        return "Tweet({}, {!r})".format(self.id, self.text)
+
+
+class UserBatch:
+    """UserBatch.
+    users by column.
+    """
+    __slots__ = ("ids", "names", "usernames", "created_at")
+
+    def __init__(self):
+        self.ids = array("q")
+        self.names = []
+        self.usernames = []
+        self.created_at = []
+
+    @classmethod
+    def from_json(cls, users: list):
+        """from_json.
+        page of v2 user objects (json_res['data']) to UserBatch.
+
+        Args:
+            users (list): users
+
+        Returns:
+            UserBatch:
+        """
+        batch = cls()
+        batch.ids = array("q", [int(j['id']) for j in users])
+        batch.names = [j['name'] for j in users]
+        batch.usernames = [j['username'] for j in users]
+        batch.created_at = [j.get('created_at') for j in users]
+        return batch
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i: int) -> User:
+        return User(self.ids[i], self.names[i], self.usernames[i],
+                    self.created_at[i])
+
+    def __iter__(self):
+        return map(User, self.ids, self.names, self.usernames, self.created_at)
+
+    def append(self, user: User):
+        """append. ids can't be appended while id_array() is used."""
+        self.ids.append(user.id)
+        self.names.append(user.name)
+        self.usernames.append(user.username)
+        self.created_at.append(user.created_at)
+
+    def extend(self, batch):
+        """extend. add all users of other batch."""
+        self.ids.extend(batch.ids)
+        self.names.extend(batch.names)
+        self.usernames.extend(batch.usernames)
+        self.created_at.extend(batch.created_at)
+
+    def id_array(self):
+        """numpy int64 view of ids (not copied)."""
+        return np.frombuffer(self.ids, dtype=np.int64)
+
+    def csv_rows(self) -> list:
+        """rows of <user_id>_followers_data.csv. comma of name is removed."""
+        ids = [str(i) for i in self.ids]
+        return [[name.replace(',', ''), user_id, username, FOLLOWER_LINK + user_id]
+                for name, user_id, username in zip(self.names, ids, self.usernames)]
+
+
+class TweetBatch:
+    """TweetBatch.
+    tweets by column.
+    """
+    __slots__ = ("ids", "texts", "author_ids", "langs", "created_at")
+
+    def __init__(self):
+        self.ids = array("q")
+        self.texts = []
+        self.author_ids = array("q")
+        self.langs = []
+        self.created_at = []
+
+    @classmethod
+    def from_json(cls, tweets: list, author_id=None):
+        """from_json.
+        page of v2 tweet objects (json_res['data']) to TweetBatch.
+
+        Args:
+            tweets (list): tweets
+            author_id: used if tweet doesn't have author_id.
+
+        Returns:
+            TweetBatch:
+        """
+        batch = cls()
+        default = UNKNOWN_ID if author_id is None else int(author_id)
+        batch.ids = array("q", [int(j['id']) for j in tweets])
+        batch.texts = [j['text'] for j in tweets]
+        batch.author_ids = array("q", [int(j['author_id']) if 'author_id' in j
+                                       else default for j in tweets])
+        batch.langs = [intern(j.get('lang')) for j in tweets]
+        batch.created_at = [j.get('created_at') for j in tweets]
+        return batch
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i: int) -> Tweet:
+        return Tweet(self.ids[i], self.texts[i], self.author_ids[i],
+                     self.langs[i], self.created_at[i])
+
+    def __iter__(self):
+        return map(Tweet, self.ids, self.texts, self.author_ids, self.langs,
+                   self.created_at)
+
+    def append(self, tweet: Tweet):
+        """append. ids can't be appended while id_array() is used."""
+        self.ids.append(tweet.id)
+        self.texts.append(tweet.text)
+        self.author_ids.append(tweet.author_id)
+        self.langs.append(intern(tweet.lang))
+        self.created_at.append(tweet.created_at)
+
+    def extend(self, batch):
+        """extend. add all tweets of other batch."""
+        self.ids.extend(batch.ids)
+        self.texts.extend(batch.texts)
+        self.author_ids.extend(batch.author_ids)
+        self.langs.extend(batch.langs)
+        self.created_at.extend(batch.created_at)
+
+    def id_array(self):
+        """numpy int64 view of ids (not copied)."""
+        return np.frombuffer(self.ids, dtype=np.int64)
+
+    def author_id_array(self):
+        """numpy int64 view of author_ids (not copied)."""
+        return np.frombuffer(self.author_ids, dtype=np.int64)
+
+    def csv_rows(self) -> list:
+        """rows of <user_id>_favorite_tweets csv. [text, id, author_id, link]"""
+        rows = []
+        for text, tweet_id, author_id in zip(self.texts, self.ids, self.author_ids):
+            tweet_id, author_id = str(tweet_id), str(author_id)
+            rows.append([text, tweet_id, author_id,
+                         "https://twitter.com/" + author_id + "/status/" + tweet_id])
+        return rows
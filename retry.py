@@ -0,0 +1,150 @@
+# coding: utf-8
+"""
+Name: retry.py
+
+Send request again until it succeeds, without recursion.
+429 waits until x-rate-limit-reset (see rate_limit.py) and at least
+backoff time, and it is sent again up to max_retries times.
+5xx and connection errors wait by exponential backoff with jitter.
+retry_request_async() is the same loop for asyncio (async_client.py).
+
+Usage:
+    response = retry_request(partial(requests.get, url, params=payload,
+                                     headers=headers),
+                             url, rate_limiter)
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+import asyncio
+import random
+import time
+import requests
+
+MAX_RETRIES = 5
+BASE_DELAY = 1.0
+MAX_DELAY = 60.0
+
+# connection errors which are sent again.
+RETRY_EXCEPTIONS = (requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout)
+try:
+    import httpx
+    RETRY_EXCEPTIONS += (httpx.TransportError,)
+except ImportError:
+    pass
+try:
+    import aiohttp
+    RETRY_EXCEPTIONS += (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+except ImportError:
+    pass
+
+
+def backoff_time(attempt: int, base_delay: float = BASE_DELAY,
+                 max_delay: float = MAX_DELAY) -> float:
+    """backoff_time.
+    full jitter: random time between 0 and base_delay * 2**attempt.
+
+    Args:
+        attempt (int): the number of failed requests.
+        base_delay (float): base_delay
+        max_delay (float): max_delay
+
+    Returns:
+        float:
+    """
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def retry_request(send, url, rate_limiter, on_wait=None,
+                  max_retries: int = MAX_RETRIES, retry_429: bool = True):
+    """retry_request.
+    call send() until response is not 429 and not 5xx.
+
+    Args:
+        send: callable which sends request and returns response.
+        url: url used as rate limit key.
+        rate_limiter (RateLimiter): rate_limiter
+        on_wait: called before sleeping until rate limit is reset.
+        max_retries (int): max retry count of 429, 5xx and connection errors.
+        retry_429 (bool): If False, 429 is returned to caller (e.g. to use other token).
+
+    Returns:
+        requests.models.Response: last response. 429 or 5xx is returned when retry count is over.
+    """
+    attempt = 0
+    attempt_429 = 0
+    while True:
+        if on_wait is not None and rate_limiter.wait_time(url) > 0:
+            on_wait()
+        rate_limiter.wait(url)
+
+        try:
+            response = send()
+        except RETRY_EXCEPTIONS:
+            if attempt >= max_retries:
+                raise
+            time.sleep(backoff_time(attempt))
+            attempt += 1
+            continue
+        rate_limiter.update(url, response)
+
+        # rate_limiter knows reset time, next wait() sleeps until reset.
+        if response.status_code == 429 and retry_429 and attempt_429 < max_retries:
+            time.sleep(backoff_time(attempt_429))
+            attempt_429 += 1
+            continue
+        if response.status_code >= 500 and attempt < max_retries:
+            time.sleep(backoff_time(attempt))
+            attempt += 1
+            continue
+        return response
+
+
+async def retry_request_async(send, url, rate_limiter, on_wait=None,
+                              max_retries: int = MAX_RETRIES,
+                              retry_429: bool = True):
+    """retry_request_async.
+    same as retry_request(), but send() is coroutine function and waits
+    are asyncio.sleep(), so other tasks run meanwhile and task can be cancelled.
+
+    Args:
+        send: coroutine function which sends request and returns response.
+        url: url used as rate limit key.
+        rate_limiter (RateLimiter): rate_limiter
+        on_wait: called before sleeping until rate limit is reset.
+        max_retries (int): max retry count of 429, 5xx and connection errors.
+        retry_429 (bool): If False, 429 is returned to caller (e.g. to use other token).
+
+    Returns:
+        response: last response. 429 or 5xx is returned when retry count is over.
+    """
+    attempt = 0
+    attempt_429 = 0
+    while True:
+        wait_time = rate_limiter.acquire(url)
+        if wait_time > 0:
+            if on_wait is not None:
+                on_wait()
+            await asyncio.sleep(wait_time)
+            continue
+
+        try:
+            response = await send()
+        except RETRY_EXCEPTIONS:
+            if attempt >= max_retries:
+                raise
+            await asyncio.sleep(backoff_time(attempt))
+            attempt += 1
+            continue
+        rate_limiter.update(url, response)
+
+        if response.status_code == 429 and retry_429 and attempt_429 < max_retries:
+            await asyncio.sleep(backoff_time(attempt_429))
+            attempt_429 += 1
+            continue
+        if response.status_code >= 500 and attempt < max_retries:
+            await asyncio.sleep(backoff_time(attempt))
+            attempt += 1
+            continue
+        return response
@@ -0,0 +1,94 @@
+# coding: utf-8
+"""
+Name: seen_ids.py
+
+Remember tweet ids which are already saved by monitor.
+Only the newest capacity ids are kept (ring buffer + set), so lookup is
+O(1) and memory doesn't grow however long monitor runs.
+ids are saved to file, so restarted monitor doesn't save same tweets again.
+
+Usage:
+    seen = SeenIds(capacity=100000, path="monitor_seen.txt")
+    if seen.add(tweet['id']):
+        save_file(tweet, user_id)
+    seen.save()
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+from collections import deque
+import os
+
+CAPACITY = 100000
+SEEN_FILE = "monitor_seen.txt"
+
+
+class SeenIds:
+    """SeenIds.
+    set of the newest capacity tweet ids. oldest id is dropped first.
+    """
+
+    def __init__(self, capacity: int = CAPACITY, path: str = None):
+        """__init__.
+
+        Args:
+            capacity (int): max ids to remember.
+            path (str): file to save ids. If None, ids are not saved.
+        """
+        self.capacity = capacity
+        self.path = path
+        self._ring = deque()
+        self._set = set()
+        if path is not None:
+            self._load()
+
+    def _load(self):
+        """_load."""
+        try:
+            with open(self.path, mode="r") as f:
+                for line in f:
+                    if line.strip():
+                        self.add(line)
+        except FileNotFoundError:
+            pass
+
+    def __contains__(self, tweet_id) -> bool:
+        return int(tweet_id) in self._set
+
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    def add(self, tweet_id) -> bool:
+        """add.
+
+        Args:
+            tweet_id: tweet id (str or int).
+
+        Returns:
+            bool: False if tweet_id is already seen.
+        """
+        tweet_id = int(tweet_id)
+        if tweet_id in self._set:
+            return False
+        if len(self._ring) >= self.capacity:
+            self._set.discard(self._ring.popleft())
+        self._ring.append(tweet_id)
+        self._set.add(tweet_id)
+        return True
+
+    def newest(self) -> int:
+        """newest.
+        the largest remembered tweet id. None if no id is remembered.
+        """
+        return max(self._ring, default=None)
+
+    def save(self):
+        """save.
+        write temporary file and rename it, oldest id first.
+        """
+        if self.path is None:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, mode="w") as f:
+            f.write("".join("{}\n".format(tweet_id) for tweet_id in self._ring))
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,347 @@
+# coding: utf-8
+"""
+Name: storage.py
+
+Save crawled data as Parquet instead of csv (pyarrow is needed).
+<name>.parquet is a directory. Each page is written to its own part file
+as one row group, so a crawl which is stopped never leaves broken file.
+When a crawl is finished, part files are merged to one file.
+ids are int64 and created_at is timestamp.
+read_followers() reads followers csv or parquet in one pass, and can
+yield chunks of rows to process large file in bounded memory.
+
+Usage:
+    sink = ParquetSink("<user_id>_followers_data.parquet", FOLLOWERS_COLUMNS)
+    sink.write_page(followers_table(UserBatch.from_json(page)))
+    df = read_table("<user_id>_followers_data.parquet", columns=["id"])
+    for chunk in read_followers("<user_id>_followers_data.csv", chunksize=100000):
+        print(chunk['id'])
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+import glob
+from itertools import islice
+import os
+from os.path import isdir, join
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# page is written as one row group, so a page is not split.
+ROW_GROUP_SIZE = 1000
+COMPRESSION = "zstd"
+FOLLOWERS_COLUMNS = ("id", "name", "username", "created_at")
+FAVOURITES_COLUMNS = ("id", "text", "author_id", "lang")
+# columns of csvfile created by fetch_follower_list.py
+FOLLOWERS_CSV_COLUMNS = ("name", "id", "username", "link")
+CHUNKSIZE = 100000
+
+
+def require_pyarrow():
+    """raise ImportError if pyarrow is not installed."""
+    if pa is None:
+        raise ImportError("pyarrow is needed to use parquet format. "
+                          "pip install pyarrow")
+
+
+def is_parquet(path: str) -> bool:
+    """is_parquet.
+
+    Args:
+        path (str): path
+
+    Returns:
+        bool:
+    """
+    return path.rstrip("/").endswith(".parquet")
+
+
+def parquet_name(csv_file: str) -> str:
+    """parquet_name.
+    <user_id>_followers_data.csv -> <user_id>_followers_data.parquet
+
+    Args:
+        csv_file (str): csv_file
+
+    Returns:
+        str:
+    """
+    return os.path.splitext(csv_file)[0] + ".parquet"
+
+
+def parse_created_at(values: list):
+    """parse_created_at.
+    2021-10-01T04:26:15.000Z -> timestamp[ms, UTC]
+
+    Args:
+        values (list): created_at strings.
+
+    Returns:
+        pyarrow.Array:
+    """
+    return pa.array(pd.to_datetime(values, utc=True, format="ISO8601"),
+                    type=pa.timestamp("ms", tz="UTC"))
+
+
+def followers_table(batch):
+    """followers_table.
+    followers page of /2/users/:id/followers to table.
+    ids are passed to pyarrow without copy.
+
+    Args:
+        batch (UserBatch): UserBatch.from_json(json_res['data'])
+
+    Returns:
+        pyarrow.Table:
+    """
+    require_pyarrow()
+    return pa.table({
+        "id": pa.array(batch.id_array(), type=pa.int64()),
+        "name": pa.array(batch.names, type=pa.string()),
+        "username": pa.array(batch.usernames, type=pa.string()),
+        "created_at": parse_created_at(batch.created_at),
+    })
+
+
+def favourites_table(batch):
+    """favourites_table.
+    tweets page of /2/users/:id/liked_tweets to table.
+    ids are passed to pyarrow without copy.
+
+    Args:
+        batch (TweetBatch): TweetBatch.from_json(json_res['data'])
+
+    Returns:
+        pyarrow.Table:
+    """
+    require_pyarrow()
+    return pa.table({
+        "id": pa.array(batch.id_array(), type=pa.int64()),
+        "text": pa.array(batch.texts, type=pa.string()),
+        "author_id": pa.array(batch.author_id_array(), type=pa.int64()),
+        "lang": pa.array(batch.langs, type=pa.string()),
+    })
+
+
+class ParquetSink:
+    """ParquetSink.
+    append pages to <name>.parquet directory. part file name is its first row number.
+    """
+
+    def __init__(self, path: str, columns: tuple):
+        """__init__.
+
+        Args:
+            path (str): <name>.parquet directory.
+            columns (tuple): column order.
+        """
+        require_pyarrow()
+        self.path = path
+        self.columns = list(columns)
+        os.makedirs(path, exist_ok=True)
+        self.rows = sum(rows for _, rows in self._parts())
+
+    def _parts(self) -> list:
+        """_parts.
+        [(part file path, the number of rows)] sorted by first row number.
+        """
+        parts = sorted(glob.glob(join(self.path, "part-*.parquet")))
+        return [(part, pq.ParquetFile(part).metadata.num_rows)
+                for part in parts]
+
+    def _write(self, table, first_row: int):
+        """_write.
+        write table to temporary file and rename it.
+        """
+        part = join(self.path, "part-{:015d}.parquet".format(first_row))
+        tmp_path = part + ".tmp"
+        pq.write_table(table.select(self.columns), tmp_path,
+                       row_group_size=max(ROW_GROUP_SIZE, table.num_rows),
+                       compression=COMPRESSION)
+        os.replace(tmp_path, part)
+
+    def write_page(self, table) -> int:
+        """write_page.
+        append one page as one row group.
+
+        Args:
+            table (pyarrow.Table): table
+
+        Returns:
+            int: the number of saved rows. It is used as checkpoint offset.
+        """
+        self._write(table, self.rows)
+        self.rows += table.num_rows
+        return self.rows
+
+    def truncate(self, rows: int):
+        """truncate.
+        drop rows which are written after checkpoint.
+
+        Args:
+            rows (int): the number of rows to keep.
+        """
+        first_row = 0
+        for part, num_rows in self._parts():
+            if first_row >= rows:
+                os.remove(part)
+            elif first_row + num_rows > rows:
+                table = pq.read_table(part).slice(0, rows - first_row)
+                self._write(table, first_row)
+            first_row += num_rows
+        self.rows = min(self.rows, rows)
+
+    def compact(self):
+        """compact.
+        merge part files to one file. row groups are kept.
+        """
+        parts = self._parts()
+        if len(parts) <= 1:
+            return
+        merged = join(self.path, "merged.tmp")
+        with pq.ParquetWriter(merged, pq.read_schema(parts[0][0]),
+                              compression=COMPRESSION) as writer:
+            for part, _ in parts:
+                parquet_file = pq.ParquetFile(part)
+                for i in range(parquet_file.num_row_groups):
+                    writer.write_table(parquet_file.read_row_group(i))
+        os.replace(merged, parts[0][0])
+        for part, _ in parts[1:]:
+            os.remove(part)
+
+
+def parquet_parts(path: str) -> list:
+    """parquet_parts.
+    part files of <name>.parquet directory. If path is file, [path].
+
+    Args:
+        path (str): path
+
+    Returns:
+        list:
+    """
+    if isdir(path):
+        return sorted(glob.glob(join(path, "part-*.parquet")))
+    return [path]
+
+
+def read_table(path: str, columns: list = None):
+    """read_table.
+    read only selected columns of <name>.parquet.
+
+    Args:
+        path (str): <name>.parquet directory or file.
+        columns (list): columns
+
+    Returns:
+        pandas.DataFrame:
+    """
+    require_pyarrow()
+    return pq.read_table(parquet_parts(path), columns=columns).to_pandas()
+
+
+def iter_table(path: str, columns: list = None, chunksize: int = CHUNKSIZE):
+    """iter_table.
+    yield selected columns of <name>.parquet, chunksize rows per DataFrame.
+
+    Args:
+        path (str): <name>.parquet directory or file.
+        columns (list): columns
+        chunksize (int): chunksize
+
+    Returns:
+        generator:
+    """
+    require_pyarrow()
+    for part in parquet_parts(path):
+        for batch in pq.ParquetFile(part).iter_batches(batch_size=chunksize,
+                                                       columns=columns):
+            yield batch.to_pandas()
+
+
+def complete_rows(rows: list) -> list:
+    """complete_rows.
+    drop rows which have empty or non-numeric id, or miss columns
+    (e.g. last line half-written when crawl was killed).
+    """
+    position = FOLLOWERS_CSV_COLUMNS.index("id")
+    return [row for row in rows if len(row) == len(FOLLOWERS_CSV_COLUMNS)
+            and row[position].strip().isdigit()]
+
+
+def rows_to_frame(rows: list, columns: list, id_dtype):
+    """rows_to_frame.
+    split csv lines to DataFrame. only id is converted to id_dtype.
+    """
+    data = {}
+    for column in columns:
+        position = FOLLOWERS_CSV_COLUMNS.index(column)
+        values = [row[position].strip() if position < len(row) else ""
+                  for row in rows]
+        if column == "id":
+            values = np.array(values, dtype=id_dtype)
+        elif column == "name":
+            # csv module quotes name which has '"'.
+            values = [value[1:-1].replace('""', '"')
+                      if len(value) > 1 and value[0] == value[-1] == '"' else value
+                      for value in values]
+        data[column] = values
+    return pd.DataFrame(data, columns=columns)
+
+
+def iter_followers_csv(csvfile: str, columns: list = None,
+                       chunksize: int = CHUNKSIZE, id_dtype=np.int64):
+    """iter_followers_csv.
+    read csvfile created by fetch_follower_list.py in one pass.
+    Line is split from right, so name can contain comma.
+
+    Args:
+        csvfile (str): csvfile
+        columns (list): columns. default is all columns.
+        chunksize (int): rows per DataFrame.
+        id_dtype: np.int64 or str.
+
+    Returns:
+        generator:
+    """
+    columns = list(columns or FOLLOWERS_CSV_COLUMNS)
+    with open(csvfile, mode="r", encoding="utf-8") as f:
+        while True:
+            lines = list(islice(f, chunksize))
+            if not lines:
+                return
+            rows = [line.rstrip("\n").rsplit(",", 3)
+                    for line in lines if line.strip()]
+            yield rows_to_frame(complete_rows(rows), columns, id_dtype)
+
+
+def read_followers(path: str, columns: list = None, chunksize: int = None,
+                   id_dtype=np.int64):
+    """read_followers.
+    read followers csv or parquet. If chunksize is set, return generator.
+
+    Args:
+        path (str): csvfile or <name>.parquet
+        columns (list): columns
+        chunksize (int): rows per DataFrame.
+        id_dtype: np.int64 or str. parquet id is always int64.
+
+    Returns:
+        pandas.DataFrame or generator:
+    """
+    if is_parquet(path):
+        if chunksize is None:
+            return read_table(path, columns)
+        return iter_table(path, columns, chunksize)
+    if chunksize is None:
+        chunks = list(iter_followers_csv(path, columns, CHUNKSIZE, id_dtype))
+        if not chunks:
+            return pd.DataFrame({c: [] for c in columns or FOLLOWERS_CSV_COLUMNS})
+        return pd.concat(chunks, ignore_index=True)
+    return iter_followers_csv(path, columns, chunksize, id_dtype)
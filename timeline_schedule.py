@@ -0,0 +1,141 @@
+# coding: utf-8
+"""
+Name: timeline_schedule.py
+
+Decide when each user of watchlist is polled by monitor_timeline_per1min.py.
+Each user has since_id (the newest tweet id already saved), so poll
+fetches only newer tweets. User who tweets often is polled often, and
+quiet user is polled less. Intervals are never shorter than the rate
+limit budget allows for the whole watchlist.
+State is saved to monitor_state.json, so restarted monitor continues
+from since_id.
+
+Usage:
+    schedule = TimelineSchedule(user_ids)
+    user_id, wait_time = schedule.next()
+    schedule.done(user_id, new_tweets, newest_id)
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+import heapq
+import json
+import os
+import time
+
+STATE_FILE = "monitor_state.json"
+# /2/users/:id/tweets can be requested 1500 times per 15min.
+WINDOW = 60*15
+REQUESTS_PER_WINDOW = 1500
+MIN_INTERVAL = 60
+MAX_INTERVAL = 60*60
+# poll when this number of new tweets is expected.
+TWEETS_PER_POLL = 5
+# weight of last poll in tweets/sec average.
+SMOOTHING = 0.3
+SAVE_INTERVAL = 10
+
+
+class TimelineSchedule:
+    """TimelineSchedule.
+    priority queue of (next poll time, user_id).
+    """
+
+    def __init__(self, user_ids: list, path: str = STATE_FILE,
+                 budget: int = REQUESTS_PER_WINDOW,
+                 min_interval: float = MIN_INTERVAL,
+                 max_interval: float = MAX_INTERVAL):
+        """__init__.
+
+        Args:
+            user_ids (list): watchlist.
+            path (str): state file.
+            budget (int): requests per 15min for all users (e.g. 1500 * tokens).
+            min_interval (float): min seconds between polls of a user.
+            max_interval (float): max seconds between polls of a user.
+        """
+        self.path = path
+        self.user_ids = list(dict.fromkeys(user_ids))
+        # spread polls of all users over the window within budget.
+        self.min_interval = max(min_interval, len(self.user_ids) * WINDOW / budget)
+        self.max_interval = max(max_interval, self.min_interval)
+        self.state = self._load()
+        self._saved = time.time()
+
+        now = time.time()
+        self._heap = []
+        for i, user_id in enumerate(self.user_ids):
+            state = self.state.setdefault(user_id, {
+                "since_id": None, "rate": 0.0, "last_poll": None,
+                "interval": self.min_interval})
+            # first polls are spread over min_interval, not sent at once.
+            next_poll = now + self.min_interval * i / max(1, len(self.user_ids))
+            if state['last_poll'] is not None:
+                next_poll = max(next_poll, state['last_poll'] + state['interval'])
+            heapq.heappush(self._heap, (next_poll, user_id))
+
+    def _load(self) -> dict:
+        """_load."""
+        try:
+            with open(self.path, mode="r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def since_id(self, user_id: str) -> str:
+        """since_id.
+        newest tweet id already saved. None if user is not polled yet.
+        """
+        return self.state[user_id]['since_id']
+
+    def next(self) -> tuple:
+        """next.
+        user to poll next and seconds until the poll.
+
+        Returns:
+            tuple: (user_id, wait_time)
+        """
+        next_poll, user_id = heapq.heappop(self._heap)
+        return user_id, max(0.0, next_poll - time.time())
+
+    def done(self, user_id: str, new_tweets: int, newest_id: str = None):
+        """done.
+        update since_id and tweets/sec of user, then schedule next poll.
+
+        Args:
+            user_id (str): user_id
+            new_tweets (int): the number of new tweets found by the poll.
+            newest_id (str): newest tweet id found by the poll.
+        """
+        state = self.state[user_id]
+        now = time.time()
+        if newest_id is not None and (state['since_id'] is None or
+                                      int(newest_id) > int(state['since_id'])):
+            state['since_id'] = newest_id
+        # first poll doesn't know how long the tweets took.
+        if state['last_poll'] is not None:
+            observed = new_tweets / max(1.0, now - state['last_poll'])
+            state['rate'] = SMOOTHING * observed + (1 - SMOOTHING) * state['rate']
+        state['last_poll'] = now
+
+        if state['rate'] > 0:
+            interval = TWEETS_PER_POLL / state['rate']
+        else:
+            interval = self.max_interval
+        # quiet user is slowed down step by step.
+        interval = min(interval, state['interval'] * 2)
+        state['interval'] = min(self.max_interval, max(self.min_interval, interval))
+        heapq.heappush(self._heap, (now + state['interval'], user_id))
+
+        if now - self._saved >= SAVE_INTERVAL:
+            self.save()
+
+    def save(self):
+        """save.
+        write temporary file and rename it, so state is never broken.
+        """
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, mode="w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
+        self._saved = time.time()
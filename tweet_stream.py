@@ -0,0 +1,243 @@
+# coding: utf-8
+"""
+Name: tweet_stream.py
+
+Receive tweets of watchlist users by filtered stream instead of polling.
+Rules "from:<id> OR from:<id> ..." are made from watchlist and only
+rules tagged "watchlist" are replaced. Stream is newline delimited json,
+and each line is parsed as soon as it arrives.
+When stream is disconnected, it is connected again with backoff, and
+tweets posted meanwhile are fetched by recent search (since_id).
+Rules, recent search and stream are sent by one token (app_token) of
+TokenPool, because rules belong to app.
+
+Usage:
+    keep_streaming(user_ids, client, seen, on_tweet)
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+from datetime import datetime, timezone
+import time
+import requests
+from json_codec import loads, response_json
+from retry import RETRY_EXCEPTIONS, backoff_time
+
+API_URL = "https://api.twitter.com"
+RULE_LENGTH = 512
+RULE_TAG = "watchlist"
+# Twitter sends keep-alive newline every 20 seconds.
+STALL_TIMEOUT = 30
+TWEET_FIELDS = "created_at,author_id"
+SAVE_INTERVAL = 10
+# recent search finds tweets of last 7 days. margin is for clock skew.
+SEARCH_WINDOW = 7 * 24 * 60 * 60
+SEARCH_MARGIN = 60
+# tweet id (snowflake) has milliseconds since this epoch in upper bits.
+TWITTER_EPOCH_MS = 1288834974657
+
+STREAM_EXCEPTIONS = RETRY_EXCEPTIONS + (requests.exceptions.ChunkedEncodingError,)
+
+
+def build_rules(user_ids: list, max_length: int = RULE_LENGTH) -> list:
+    """build_rules.
+    join "from:<id>" by OR. each rule is shorter than max_length.
+
+    Args:
+        user_ids (list): user_ids
+        max_length (int): max length of rule.
+
+    Returns:
+        list:
+    """
+    rules = []
+    rule = ""
+    for user_id in dict.fromkeys(user_ids):
+        term = "from:{}".format(user_id)
+        if rule and len(rule) + len(" OR ") + len(term) > max_length:
+            rules.append(rule)
+            rule = ""
+        rule = term if not rule else rule + " OR " + term
+    if rule:
+        rules.append(rule)
+    return rules
+
+
+def check_response(response):
+    """raise Exception if response is not 2xx."""
+    if not 200 <= response.status_code < 300:
+        raise Exception(
+            "Request returned an error: {} {}".format(
+                response.status_code, response.text
+            )
+        )
+
+
+def sync_rules(client, rules: list, api_url: str = API_URL):
+    """sync_rules.
+    delete old watchlist rules and add new rules. other rules are kept.
+    all requests are sent by client.app_token(), which stream uses.
+
+    Args:
+        client (TwitterClient): client
+        rules (list): rules
+        api_url (str): api_url
+    """
+    url = api_url + "/2/tweets/search/stream/rules"
+    token = client.app_token()
+    response = client.get(url, token=token)
+    check_response(response)
+    current = [rule for rule in response_json(response).get('data', [])
+               if rule.get('tag') == RULE_TAG]
+
+    stale = [rule['id'] for rule in current if rule['value'] not in rules]
+    if stale:
+        check_response(client.post(url, json={"delete": {"ids": stale}},
+                                   token=token))
+    values = {rule['value'] for rule in current}
+    new_rules = [{"value": rule, "tag": RULE_TAG}
+                 for rule in rules if rule not in values]
+    if new_rules:
+        check_response(client.post(url, json={"add": new_rules}, token=token))
+
+
+def iter_json_lines(chunks):
+    """iter_json_lines.
+    split received bytes by newline and parse each line.
+    empty line (keep-alive) is skipped.
+
+    Args:
+        chunks: iterable of bytes.
+
+    Returns:
+        generator: json objects.
+    """
+    buffer = b""
+    for chunk in chunks:
+        lines = (buffer + chunk).split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield loads(line)
+    if buffer.strip():
+        yield loads(buffer)
+
+
+def tweet_time(tweet_id) -> float:
+    """tweet_time.
+    unix time when tweet was posted, read from tweet id.
+
+    Args:
+        tweet_id: tweet_id
+
+    Returns:
+        float:
+    """
+    return ((int(tweet_id) >> 22) + TWITTER_EPOCH_MS) / 1000
+
+
+def search_range(since_id, now: float = None) -> dict:
+    """search_range.
+    since_id, or start_time if since_id is older than recent search window
+    (since_id out of window is 400 error).
+
+    Args:
+        since_id: newest tweet id already received.
+        now (float): unix time.
+
+    Returns:
+        dict: params of recent search.
+    """
+    start = (time.time() if now is None else now) - SEARCH_WINDOW + SEARCH_MARGIN
+    if tweet_time(since_id) > start:
+        return {"since_id": str(since_id)}
+    start_time = datetime.fromtimestamp(start, timezone.utc)
+    return {"start_time": start_time.strftime("%Y-%m-%dT%H:%M:%SZ")}
+
+
+def backfill(client, rules: list, since_id, api_url: str = API_URL) -> list:
+    """backfill.
+    tweets which match rules and are newer than since_id, oldest first.
+    recent search can find tweets of last 7 days, so older tweets are lost.
+
+    Args:
+        client (TwitterClient): client
+        rules (list): rules
+        since_id: newest tweet id already received.
+        api_url (str): api_url
+
+    Returns:
+        list:
+    """
+    url = api_url + "/2/tweets/search/recent"
+    tweets = []
+    for rule in rules:
+        payload = {"query": rule, "tweet.fields": TWEET_FIELDS,
+                   "max_results": "100", **search_range(since_id)}
+        while True:
+            response = client.get(url, params=payload, token=client.app_token())
+            check_response(response)
+            json_res = response_json(response)
+            tweets.extend(json_res.get('data', []))
+            if 'next_token' not in json_res.get('meta', {}):
+                break
+            payload.update(next_token=json_res['meta']['next_token'])
+    return sorted(tweets, key=lambda tweet: int(tweet['id']))
+
+
+def keep_streaming(user_ids: list, client, seen, on_tweet,
+                   api_url: str = API_URL):
+    """keep_streaming.
+    receive tweets of user_ids until process is stopped.
+
+    Args:
+        user_ids (list): watchlist.
+        client (TwitterClient): client created with http2=False.
+        seen (SeenIds): ids of received tweets. newest id is used to backfill.
+        on_tweet: called with each new tweet.
+        api_url (str): api_url. mock server can be set.
+    """
+    rules = build_rules(user_ids)
+    sync_rules(client, rules, api_url)
+    url = api_url + "/2/tweets/search/stream"
+
+    def receive(tweet):
+        if seen.add(tweet['id']):
+            on_tweet(tweet)
+
+    attempt = 0
+    saved = time.time()
+    while True:
+        # tweets posted while stream was disconnected.
+        # If recent search fails, they are skipped and stream is connected.
+        if seen.newest() is not None:
+            try:
+                for tweet in backfill(client, rules, seen.newest(), api_url):
+                    receive(tweet)
+            except Exception as error:
+                print("-----Backfill is skipped: {}-----".format(error))
+
+        try:
+            # response is closed even if stream is stalled or broken.
+            with client.stream(url, params={"tweet.fields": TWEET_FIELDS},
+                               read_timeout=STALL_TIMEOUT) as response:
+                if response.status_code == 200:
+                    print("-----Connected to stream.-----")
+                    attempt = 0
+                    for message in iter_json_lines(response.iter_content(chunk_size=None)):
+                        if 'data' in message:
+                            receive(message['data'])
+                        elif 'errors' in message:
+                            print("-----{}-----".format(message['errors']))
+                        if time.time() - saved >= SAVE_INTERVAL:
+                            seen.save()
+                            saved = time.time()
+                else:
+                    print("-----Stream returned an error: {} {}-----"
+                          .format(response.status_code, response.text))
+        except STREAM_EXCEPTIONS as error:
+            print("-----Stream is disconnected: {}-----".format(error))
+
+        # 429 waits until reset in next client.stream().
+        time.sleep(backoff_time(attempt))
+        attempt += 1
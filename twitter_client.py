@@ -0,0 +1,297 @@
+# coding: utf-8
+"""
+Name: twitter_client.py
+
+HTTP client shared by all scripts.
+One keep-alive session is reused for all requests, so TCP and TLS
+handshakes are done once per host. If httpx and h2 are installed,
+HTTP/2 is used. Each request is timed and summary can be displayed.
+If TokenPool is given, each request is sent by the token which has
+the most remaining quota.
+
+Usage:
+    client = TwitterClient(headers)
+    response = client.get(url, params=payload)
+    client.show_timings()
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+from functools import partial
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from rate_limit import RateLimiter
+from retry import MAX_RETRIES, retry_request
+
+try:
+    import httpx
+    import h2  # noqa: F401  httpx needs h2 for HTTP/2.
+except ImportError:
+    httpx = None
+
+POOL_SIZE = 10
+TIMEOUT = 10
+
+
+def create_session(pool_size: int = POOL_SIZE, http2: bool = True,
+                   pool_block: bool = False):
+    """create_session.
+    create keep-alive session with connection pool.
+
+    Args:
+        pool_size (int): max connections kept per host.
+        http2 (bool): use HTTP/2 when httpx and h2 are installed.
+        pool_block (bool): never open more than pool_size connections per host.
+
+    Returns:
+        requests.Session or httpx.Client:
+    """
+    if http2 and httpx is not None:
+        limits = httpx.Limits(max_connections=pool_size,
+                              max_keepalive_connections=pool_size)
+        return httpx.Client(http2=True, limits=limits)
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          pool_block=pool_block)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class TwitterClient:
+    """TwitterClient.
+    session, rate limiter and retry are shared by all requests.
+    """
+
+    def __init__(self, headers: dict, rate_limiter: RateLimiter = None,
+                 pool_size: int = POOL_SIZE, http2: bool = True,
+                 timeout: float = TIMEOUT, verbose: bool = False,
+                 pool_block: bool = False, token_pool=None):
+        """__init__.
+
+        Args:
+            headers (dict): headers sent to Twitter API.
+            rate_limiter (RateLimiter): rate_limiter
+            pool_size (int): max connections kept per host.
+            http2 (bool): use HTTP/2 when available.
+            timeout (float): request timeout seconds.
+            verbose (bool): display timing of each request.
+            pool_block (bool): never open more than pool_size connections per host.
+            token_pool (TokenPool): If set, Authorization of headers is replaced by its tokens.
+        """
+        self.session = create_session(pool_size, http2, pool_block)
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+        self.headers = headers
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.token_pool = token_pool
+        self.timeout = timeout
+        self.verbose = verbose
+        self.timings = {"requests": 0, "new_connections": 0,
+                        "new_wait": 0.0, "reused_wait": 0.0,
+                        "transfer": 0.0, "bytes": 0}
+        self._lock = threading.Lock()
+
+    def get(self, url: str, params: dict = None, on_wait=None, **kwargs):
+        """get.
+        send GET request to Twitter API. rate limit and retry are handled.
+
+        Args:
+            url (str): url
+            params (dict): params
+            on_wait: called before sleeping until rate limit is reset.
+
+        Returns:
+            response:
+        """
+        return self.request("get", url, params=params, on_wait=on_wait, **kwargs)
+
+    def post(self, url: str, json=None, on_wait=None, **kwargs):
+        """post.
+        send POST request with json body to Twitter API (e.g. stream rules).
+
+        Args:
+            url (str): url
+            json: request body.
+            on_wait: called before sleeping until rate limit is reset.
+
+        Returns:
+            response:
+        """
+        return self.request("post", url, json=json, on_wait=on_wait, **kwargs)
+
+    def request(self, method: str, url: str, on_wait=None, token: str = None,
+                **kwargs):
+        """request.
+        send request to Twitter API. rate limit and retry are handled.
+
+        Args:
+            method (str): get or post.
+            url (str): url
+            on_wait: called before sleeping until rate limit is reset.
+            token (str): If set, token of token_pool which always sends this request.
+
+        Returns:
+            response:
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        if self.token_pool is None:
+            kwargs.setdefault("headers", self.headers)
+            return retry_request(partial(self._send, url, method=method, **kwargs),
+                                 url, self.rate_limiter, on_wait=on_wait)
+
+        headers = self._headers_without_token(kwargs.pop("headers", {}))
+        if token is not None:
+            return retry_request(
+                partial(self._send, url, method=method,
+                        headers={**headers, **self.token_pool.authorization(token)},
+                        **kwargs),
+                url, self.token_pool.rate_limiter(token), on_wait=on_wait)
+
+        # When token gets 429, send again by other token, up to MAX_RETRIES times.
+        for _ in range(MAX_RETRIES + 1):
+            token = self.token_pool.choose(url)
+            response = retry_request(
+                partial(self._send, url, method=method,
+                        headers={**headers, **self.token_pool.authorization(token)},
+                        **kwargs),
+                url, self.token_pool.rate_limiter(token), on_wait=on_wait,
+                retry_429=False)
+            if response.status_code != 429:
+                return response
+        return response
+
+    def app_token(self):
+        """app_token.
+        token of app-level endpoints (filtered stream and its rules).
+        They must be sent by one app, so first token of token_pool is used.
+
+        Returns:
+            str: None if token_pool is not set (headers are used).
+        """
+        if self.token_pool is None:
+            return None
+        return self.token_pool.tokens[0]
+
+    def stream(self, url: str, params: dict = None, read_timeout: float = None):
+        """stream.
+        open long-lived streaming response (e.g. filtered stream).
+        Body is not read, so use response.iter_content() and close it.
+        Stream belongs to app, so app_token() is used.
+        requests session (http2=False) is needed.
+
+        Args:
+            url (str): url
+            params (dict): params
+            read_timeout (float): seconds without any data (including keep-alive) to give up.
+
+        Returns:
+            requests.models.Response:
+        """
+        headers = self.headers
+        rate_limiter = self.rate_limiter
+        if self.token_pool is not None:
+            token = self.app_token()
+            headers = {**self._headers_without_token({}),
+                       **self.token_pool.authorization(token)}
+            rate_limiter = self.token_pool.rate_limiter(token)
+        rate_limiter.wait(url)
+        response = self.session.get(url, params=params, headers=headers,
+                                    stream=True,
+                                    timeout=(self.timeout, read_timeout))
+        rate_limiter.update(url, response)
+        return response
+
+    def _headers_without_token(self, headers: dict) -> dict:
+        """_headers_without_token.
+        client headers without Authorization, and headers are added.
+        """
+        base = {key: value for key, value in self.headers.items()
+                if key.lower() != "authorization"}
+        base.update(headers)
+        return base
+
+    def download(self, url: str, **kwargs):
+        """download.
+        send GET request to CDN (e.g. icon image).
+        rate limit is not applied and Authorization header is not sent.
+
+        Args:
+            url (str): url
+
+        Returns:
+            response:
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return self._send(url, **kwargs)
+
+    def _send(self, url: str, method: str = "get", **kwargs):
+        """_send.
+        send request and record time to first byte and transfer time.
+        """
+        connections = self._count_connections(url)
+        start = time.perf_counter()
+        response = self.session.request(method.upper(), url, **kwargs)
+        waited = response.elapsed.total_seconds()
+        size = len(response.content)
+        transfer = max(0.0, time.perf_counter() - start - waited)
+        # with worker threads, other requests may open connection meanwhile.
+        new_connection = (connections is not None and
+                          self._count_connections(url) > connections)
+        with self._lock:
+            self._record(url, waited, transfer, size, new_connection)
+        return response
+
+    def _count_connections(self, url: str) -> int:
+        """_count_connections.
+        the number of connections opened by requests' pools of url scheme.
+        httpx doesn't expose it, then return None.
+        """
+        if not isinstance(self.session, requests.Session):
+            return None
+        pools = self.session.get_adapter(url).poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def _record(self, url, waited, transfer, size, new_connection):
+        """_record."""
+        timings = self.timings
+        timings["requests"] += 1
+        timings["transfer"] += transfer
+        timings["bytes"] += size
+        if new_connection:
+            timings["new_connections"] += 1
+            timings["new_wait"] += waited
+        else:
+            timings["reused_wait"] += waited
+        if self.verbose:
+            print("{} {} connect+wait {:.3f}s transfer {:.3f}s {}B".format(
+                "NEW" if new_connection else "REUSE", url,
+                waited, transfer, size))
+
+    def show_timings(self):
+        """show_timings.
+        display average time to first byte on new and reused connections.
+        The difference is connect+TLS time saved by keep-alive.
+        """
+        timings = self.timings
+        new = timings["new_connections"]
+        reused = timings["requests"] - new
+        print("{} requests, {} new connections, {} bytes."
+              .format(timings["requests"], new, timings["bytes"]))
+        if new:
+            print("new connection: {:.3f}s per request."
+                  .format(timings["new_wait"] / new))
+        if reused:
+            print("reused connection: {:.3f}s per request."
+                  .format(timings["reused_wait"] / reused))
+        if timings["requests"]:
+            print("transfer: {:.3f}s per request."
+                  .format(timings["transfer"] / timings["requests"]))
+        if self.token_pool is not None:
+            self.token_pool.show_quota()
+
+    def close(self):
+        """close."""
+        self.session.close()
@@ -0,0 +1,374 @@
+# coding: utf-8
+"""
+Name: twitter_db.py
+
+SQLite database which keeps all crawled data (twitter.sqlite).
+users, follows (user_id <- follower_id), tweets and likes tables are
+indexed by user id, author id and created_at, so analysis is done by
+query instead of reading csvfiles again.
+Each page is saved in one transaction, and same row is updated (upsert).
+
+Usage:
+    db = TwitterDB()
+    db.add_followers(user_id, json_res['data'])
+    common = db.common_followers([user_id1, user_id2])
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+import sqlite3
+import threading
+import time
+
+DB_FILE = "twitter.sqlite"
+# ids per query of "IN (...)". sqlite limits the number of parameters.
+QUERY_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY, name TEXT, username TEXT, created_at TEXT,
+    followers_count INTEGER, following_count INTEGER, tweet_count INTEGER,
+    like_count INTEGER, profile_image_url TEXT, updated_at REAL,
+    metrics_updated_at REAL, profile_image_updated_at REAL);
+CREATE INDEX IF NOT EXISTS users_followers_count ON users (followers_count);
+CREATE TABLE IF NOT EXISTS follows (
+    user_id INTEGER, follower_id INTEGER, fetched_at REAL,
+    PRIMARY KEY (user_id, follower_id)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS follows_follower_id ON follows (follower_id);
+CREATE TABLE IF NOT EXISTS tweets (
+    id INTEGER PRIMARY KEY, author_id INTEGER, text TEXT, lang TEXT,
+    created_at TEXT);
+CREATE INDEX IF NOT EXISTS tweets_author_id ON tweets (author_id, created_at);
+CREATE INDEX IF NOT EXISTS tweets_created_at ON tweets (created_at);
+CREATE TABLE IF NOT EXISTS likes (
+    user_id INTEGER, tweet_id INTEGER, fetched_at REAL,
+    PRIMARY KEY (user_id, tweet_id)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS likes_tweet_id ON likes (tweet_id);
+"""
+
+USER_COLUMNS = ("id", "name", "username", "created_at", "followers_count",
+                "following_count", "tweet_count", "like_count",
+                "profile_image_url", "updated_at", "metrics_updated_at",
+                "profile_image_updated_at")
+
+# time when each field was fetched. public_metrics are fetched together.
+# Other fields (name etc.) use updated_at, time when user was saved last.
+FIELD_TIMES = {"followers_count": "metrics_updated_at",
+               "following_count": "metrics_updated_at",
+               "tweet_count": "metrics_updated_at",
+               "like_count": "metrics_updated_at",
+               "profile_image_url": "profile_image_updated_at"}
+
+# new value is used if it is not NULL. metrics_updated_at and
+# profile_image_updated_at are NULL if page doesn't have the fields, so
+# page without public_metrics doesn't make old metrics fresh.
+UPSERT_USER = """
+INSERT INTO users (id, name, username, created_at, followers_count,
+                   following_count, tweet_count, like_count, profile_image_url,
+                   updated_at, metrics_updated_at, profile_image_updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    name = COALESCE(excluded.name, name),
+    username = COALESCE(excluded.username, username),
+    created_at = COALESCE(excluded.created_at, created_at),
+    followers_count = COALESCE(excluded.followers_count, followers_count),
+    following_count = COALESCE(excluded.following_count, following_count),
+    tweet_count = COALESCE(excluded.tweet_count, tweet_count),
+    like_count = COALESCE(excluded.like_count, like_count),
+    profile_image_url = COALESCE(excluded.profile_image_url, profile_image_url),
+    updated_at = excluded.updated_at,
+    metrics_updated_at = COALESCE(excluded.metrics_updated_at, metrics_updated_at),
+    profile_image_updated_at = COALESCE(excluded.profile_image_updated_at,
+                                        profile_image_updated_at)
+"""
+
+UPSERT_TWEET = """
+INSERT INTO tweets (id, author_id, text, lang, created_at) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    author_id = COALESCE(excluded.author_id, author_id),
+    text = COALESCE(excluded.text, text),
+    lang = COALESCE(excluded.lang, lang),
+    created_at = COALESCE(excluded.created_at, created_at)
+"""
+
+
+def user_row(user: dict, now: float) -> tuple:
+    """user_row.
+    v2 user object or v1.1 user object to users row.
+    time of fields group is now only if user has the fields.
+
+    Args:
+        user (dict): user
+        now (float): updated_at
+
+    Returns:
+        tuple:
+    """
+    metrics = user.get('public_metrics', {})
+    followers_count = metrics.get('followers_count', user.get('followers_count'))
+    profile_image_url = user.get('profile_image_url')
+    return (int(user.get('id_str') or user['id']), user.get('name'),
+            user.get('username') or user.get('screen_name'),
+            user.get('created_at'), followers_count,
+            metrics.get('following_count', user.get('friends_count')),
+            metrics.get('tweet_count', user.get('statuses_count')),
+            metrics.get('like_count', user.get('favourites_count')),
+            profile_image_url, now,
+            None if followers_count is None else now,
+            None if profile_image_url is None else now)
+
+
+def is_fresh(user: dict, fields: tuple, updated_after: float) -> bool:
+    """is_fresh.
+    user has all fields, and each field was fetched after updated_after.
+    If fields is empty, time when user was saved last is used.
+
+    Args:
+        user (dict): user. keys are USER_COLUMNS.
+        fields (tuple): fields
+        updated_after (float): unix time.
+
+    Returns:
+        bool:
+    """
+    for field in fields or ("id",):
+        fetched_at = user[FIELD_TIMES.get(field, "updated_at")]
+        if user[field] is None or fetched_at is None or fetched_at < updated_after:
+            return False
+    return True
+
+
+def tweet_row(tweet: dict, author_id=None) -> tuple:
+    """tweet_row.
+
+    Args:
+        tweet (dict): v2 tweet object.
+        author_id: used if tweet doesn't have author_id.
+
+    Returns:
+        tuple:
+    """
+    author_id = tweet.get('author_id', author_id)
+    return (int(tweet['id']), int(author_id) if author_id is not None else None,
+            tweet.get('text'), tweet.get('lang'), tweet.get('created_at'))
+
+
+class TwitterDB:
+    """TwitterDB.
+    one connection shared by threads.
+    """
+
+    def __init__(self, path: str = DB_FILE):
+        """__init__.
+
+        Args:
+            path (str): database file.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(users)")]
+        if "like_count" not in columns:
+            # twitter.sqlite created before like_count was added.
+            self._db.execute("ALTER TABLE users ADD COLUMN like_count INTEGER")
+        if "metrics_updated_at" not in columns:
+            # updated_at was time of metrics. time of icon url is unknown,
+            # so icon url is fetched again.
+            with self._db:
+                self._db.execute("ALTER TABLE users ADD COLUMN metrics_updated_at REAL")
+                self._db.execute(
+                    "ALTER TABLE users ADD COLUMN profile_image_updated_at REAL")
+                self._db.execute(
+                    "UPDATE users SET metrics_updated_at = updated_at"
+                    " WHERE followers_count IS NOT NULL")
+
+    def _write(self, statements: list):
+        """_write.
+        run [(sql, rows)] by executemany in one transaction.
+        """
+        with self._lock, self._db:
+            for sql, rows in statements:
+                self._db.executemany(sql, rows)
+
+    def _query(self, sql: str, params=()) -> list:
+        """_query."""
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def upsert_users(self, users: list):
+        """upsert_users.
+
+        Args:
+            users (list): v2 or v1.1 user objects.
+        """
+        now = time.time()
+        self._write([(UPSERT_USER, [user_row(user, now) for user in users])])
+
+    def add_followers(self, user_id, followers: list):
+        """add_followers.
+        save a page of /2/users/:id/followers.
+
+        Args:
+            user_id: user who is followed.
+            followers (list): v2 user objects.
+        """
+        now = time.time()
+        self._write([
+            (UPSERT_USER, [user_row(user, now) for user in followers]),
+            ("INSERT OR REPLACE INTO follows VALUES (?, ?, ?)",
+             [(int(user_id), int(user['id']), now) for user in followers])])
+
+    def add_follower_ids(self, user_id, follower_ids):
+        """add_follower_ids.
+
+        Args:
+            user_id: user who is followed.
+            follower_ids: follower ids.
+        """
+        now = time.time()
+        self._write([("INSERT OR REPLACE INTO follows VALUES (?, ?, ?)",
+                      [(int(user_id), int(i), now) for i in follower_ids])])
+
+    def remove_followers(self, user_id, follower_ids):
+        """remove_followers.
+        delete follows of users who unfollowed.
+
+        Args:
+            user_id: user who was followed.
+            follower_ids: follower ids.
+        """
+        self._write([("DELETE FROM follows WHERE user_id = ? AND follower_id = ?",
+                      [(int(user_id), int(i)) for i in follower_ids])])
+
+    def prune_followers(self, user_id, before: float) -> int:
+        """prune_followers.
+        after full crawl, delete follows which were not fetched again.
+
+        Args:
+            user_id: user who is followed.
+            before (float): crawl start time.
+
+        Returns:
+            int: the number of deleted follows.
+        """
+        with self._lock, self._db:
+            return self._db.execute(
+                "DELETE FROM follows WHERE user_id = ? AND fetched_at < ?",
+                (int(user_id), before)).rowcount
+
+    def add_tweets(self, tweets: list, author_id=None):
+        """add_tweets.
+
+        Args:
+            tweets (list): v2 tweet objects.
+            author_id: author of tweets if tweets don't have author_id.
+        """
+        self._write([(UPSERT_TWEET, [tweet_row(tweet, author_id)
+                                     for tweet in tweets])])
+
+    def add_likes(self, user_id, tweets: list, authors: list = ()):
+        """add_likes.
+        save a page of /2/users/:id/liked_tweets.
+
+        Args:
+            user_id: user who liked tweets.
+            tweets (list): v2 tweet objects.
+            authors (list): includes.users of page (expansions=author_id).
+        """
+        now = time.time()
+        self._write([
+            (UPSERT_USER, [user_row(user, now) for user in authors]),
+            (UPSERT_TWEET, [tweet_row(tweet) for tweet in tweets]),
+            ("INSERT OR REPLACE INTO likes VALUES (?, ?, ?)",
+             [(int(user_id), int(tweet['id']), now) for tweet in tweets])])
+
+    def follower_ids(self, user_id) -> list:
+        """follower_ids.
+
+        Args:
+            user_id: user_id
+
+        Returns:
+            list:
+        """
+        return [row[0] for row in self._query(
+            "SELECT follower_id FROM follows WHERE user_id = ?", (int(user_id),))]
+
+    def users(self, user_ids, max_age: float = None, fields: tuple = ()) -> list:
+        """users.
+        saved users of user_ids. users whose fields were fetched before
+        max_age seconds ago are not contained (see is_fresh()).
+
+        Args:
+            user_ids: user_ids
+            max_age (float): seconds. default is no limit.
+            fields (tuple): fields which users must have.
+
+        Returns:
+            list: dict per user. keys are USER_COLUMNS.
+        """
+        updated_after = time.time() - max_age if max_age is not None else 0
+        users = []
+        user_ids = [int(i) for i in user_ids]
+        for i in range(0, len(user_ids), QUERY_SIZE):
+            chunk = user_ids[i:i + QUERY_SIZE]
+            users.extend(dict(zip(USER_COLUMNS, row)) for row in self._query(
+                "SELECT {} FROM users WHERE id IN ({})"
+                .format(", ".join(USER_COLUMNS), ",".join("?" * len(chunk))),
+                chunk))
+        return [user for user in users if is_fresh(user, fields, updated_after)]
+
+    def followed_user_ids(self) -> list:
+        """followed_user_ids.
+        users whose followers are saved.
+
+        Returns:
+            list:
+        """
+        return [row[0] for row in self._query(
+            "SELECT DISTINCT user_id FROM follows ORDER BY user_id")]
+
+    def common_followers(self, user_ids: list, min_lists: int = None) -> list:
+        """common_followers.
+        followers who follow at least min_lists users of user_ids.
+
+        Args:
+            user_ids (list): user_ids
+            min_lists (int): default is all users.
+
+        Returns:
+            list: [(name, id, username, count, user_ids joined by ';')]
+        """
+        user_ids = [int(i) for i in dict.fromkeys(user_ids)]
+        marks = ",".join("?" * len(user_ids))
+        return self._query(
+            "SELECT u.name, f.follower_id, u.username, COUNT(*),"
+            " GROUP_CONCAT(f.user_id, ';')"
+            " FROM follows f LEFT JOIN users u ON u.id = f.follower_id"
+            " WHERE f.user_id IN ({}) GROUP BY f.follower_id HAVING COUNT(*) >= ?"
+            " ORDER BY f.follower_id".format(marks),
+            (*user_ids, min_lists or len(user_ids)))
+
+    def followers_rank(self, user_id, limit: int = None) -> list:
+        """followers_rank.
+        followers sorted by their followers_count.
+
+        Args:
+            user_id: user_id
+            limit (int): the number of followers. default is all.
+
+        Returns:
+            list: [(name, id, username, followers_count)]
+        """
+        return self._query(
+            "SELECT u.name, f.follower_id, u.username, u.followers_count"
+            " FROM follows f LEFT JOIN users u ON u.id = f.follower_id"
+            " WHERE f.user_id = ? ORDER BY u.followers_count DESC LIMIT ?",
+            (int(user_id), -1 if limit is None else limit))
+
+    def close(self):
+        """close."""
+        self._db.close()
@@ -0,0 +1,96 @@
+# coding: utf-8
+"""
+Name: user_lookup.py
+
+Fetch user objects 100 users per request by users/lookup.json.
+users/show.json can fetch only 1 user per request.
+
+Usage:
+    for user in lookup_users(client, user_ids):
+        print(user['id_str'], user['profile_image_url'])
+
+Author: Ryosuke Tomita
+Date: 2026/10/18
+"""
+from itertools import islice
+from json_codec import response_json
+
+LOOKUP_URL = 'https://api.twitter.com/1.1/users/lookup.json'
+# users/lookup.json accepts 100 user_id per request.
+LOOKUP_SIZE = 100
+
+
+def chunked(iterable, size: int):
+    """chunked.
+    split iterable to lists which have size items.
+
+    Args:
+        iterable: iterable
+        size (int): size
+
+    Returns:
+        generator:
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def create_params(user_ids: list) -> dict:
+    """create_params.
+
+    Args:
+        user_ids (list): up to 100 user_id.
+
+    Returns:
+        dict:
+    """
+    return {"user_id": ",".join(str(i) for i in user_ids),
+            "include_entities": "false"}
+
+
+def fetch_users(client, user_ids: list, on_wait=None) -> list:
+    """fetch_users.
+    fetch up to 100 users by one request.
+    Suspended or deleted users are not contained in result.
+
+    Args:
+        client (TwitterClient): client
+        user_ids (list): up to 100 user_id.
+        on_wait: called before sleeping until rate limit is reset.
+
+    Returns:
+        list: user objects.
+    """
+    response = client.get(LOOKUP_URL, params=create_params(user_ids),
+                          on_wait=on_wait)
+
+    # 404 means no user in user_ids exists.
+    if response.status_code == 404:
+        return []
+    if response.status_code != 200:
+        raise Exception(
+            "Request returned an error: {} {}".format(
+                response.status_code, response.text
+            )
+        )
+    return response_json(response)
+
+
+def lookup_users(client, user_ids, on_wait=None):
+    """lookup_users.
+    fetch user objects of all user_ids, LOOKUP_SIZE users per request.
+
+    Args:
+        client (TwitterClient): client
+        user_ids: iterable of user_id.
+        on_wait: called before sleeping until rate limit is reset.
+
+    Returns:
+        generator: user objects.
+    """
+    for chunk in chunked(user_ids, LOOKUP_SIZE):
+        yield from fetch_users(client, chunk, on_wait)
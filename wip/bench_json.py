@@ -0,0 +1,89 @@
+##########################################################################
+# Name: bench_json.py
+#
+# Compare decode time and allocated memory of a followers page
+# (1000 users) between response.json() and json_codec backends.
+#
+# Usage:
+#   python3 bench_json.py [-n 1000] [-r 200]
+#
+# Author: Ryosuke Tomita
+# Date: 2026/10/18
+##########################################################################
+from os.path import join,abspath,dirname
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+import requests
+sys.path.append(join(abspath(dirname(__file__)),'..'))
+import json_codec
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n","--users",help="users per page",type=int,default=1000)
+    parser.add_argument("-r","--repeat",help="the number of decoded pages",type=int,default=200)
+    p = parser.parse_args()
+    args = {"users":p.users,"repeat":p.repeat}
+    return args
+
+
+def create_page(users):
+    data = [{"id":str(1400000000000000000+i),
+             "name":"user name {} 日本語".format(i),
+             "username":"user_{}".format(i),
+             "created_at":"2021-10-01T04:26:15.000Z",
+             "public_metrics":{"followers_count":i*7,"following_count":i,
+                               "tweet_count":i*3,"listed_count":0}}
+            for i in range(users)]
+    return json.dumps({"data":data,"meta":{"result_count":users,
+                                           "next_token":"NEXTTOKEN"}}).encode()
+
+
+def create_response(content):
+    response = requests.Response()
+    response._content = content
+    response.status_code = 200
+    return response
+
+
+def measure(decode,content,repeat):
+    decode(content)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        decode(content)
+    elapsed = (time.perf_counter()-start)/repeat
+
+    tracemalloc.start()
+    page = decode(content)
+    size,peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del page
+    return elapsed,size,peak
+
+
+def main():
+    args = parse_args()
+    content = create_page(args['users'])
+    print("page: {} users, {} bytes".format(args['users'],len(content)))
+
+    decoders = [("response.json()",lambda c: create_response(c).json())]
+    for backend in ("json","orjson","msgspec"):
+        try:
+            _,loads = json_codec.select_loads(backend)
+        except ImportError:
+            print("{} is not installed.".format(backend))
+            continue
+        decoders.append(("json_codec "+backend,loads))
+
+    print("{:>20} {:>12} {:>12} {:>12}".format("decoder","ms/page","kept KB","peak KB"))
+    for name,decode in decoders:
+        elapsed,size,peak = measure(decode,content,args['repeat'])
+        print("{:>20} {:>12.3f} {:>12.0f} {:>12.0f}".format(name,elapsed*1000,size/1024,peak/1024))
+    print("default backend: {}".format(json_codec.BACKEND))
+
+
+if __name__ == "__main__":
+    main()
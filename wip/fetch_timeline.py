@@ -8,11 +8,15 @@
 # Author: Ryosuke Tomita
 # Date: 2021/08/26
 ##########################################################################
-import requests
 import os
-import time
+from os.path import join,abspath,dirname
+import sys
 import random
 import argparse
+sys.path.append(join(abspath(dirname(__file__)),'..'))
+from credentials import load_token_pool
+from json_codec import response_json
+from twitter_client import TwitterClient
 
 def parse_args():
     parser = argparse.ArgumentParser()
@@ -54,14 +58,11 @@ def select_user_agent():
     return(random_user_agent)
 
 
-def fetch_user_timeline(url,payload,headers):
+def fetch_user_timeline(url,payload,client):
     while True:
     #timeline_json = []
-        response = requests.get(url,params=payload,headers=headers)
-        if response.status_code == 429:
-            time.sleep(60*15)
-            return fetch_user_timeline(url,payload,headers)
-        json_res = response.json()
+        response = client.get(url,params=payload)
+        json_res = response_json(response)
 
         if response.status_code != 200:
             raise Exception(
@@ -92,13 +93,13 @@ def main():
     bearer_token = load_bearer_token()
     url_tweets,url_mensions = create_url(user_id)
     payload = create_params()
-    headers = create_headers(bearer_token)
+    client = TwitterClient(create_headers(bearer_token),token_pool=load_token_pool())
 
-    #timeline_json = fetch_user_timeline(url_tweets,payload,headers)
-    fetch_user_timeline(url_tweets,payload,headers)
+    #timeline_json = fetch_user_timeline(url_tweets,payload,client)
+    fetch_user_timeline(url_tweets,payload,client)
     #save_file(timeline_json,user_id)
 
-    #mentions_json = fetch_user_timeline(url_mensions,payload,headers)
+    #mentions_json = fetch_user_timeline(url_mensions,payload,client)
     #save_file(mentions_json,user_id)
 
 
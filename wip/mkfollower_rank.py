@@ -1,29 +1,45 @@
 ##########################################################################
 # Name: mkfollower_rank.py
 #
-# Using Twitter API fetch followers's follower number.
+# Using Twitter API fetch followers's follower number and rank followers.
+# followers_count is fetched by users/lookup (100 users per request) and
+# saved to twitter.sqlite (profile_cache.py). Users saved within --ttl
+# seconds are not fetched again. Result is joined by id, so suspended users don't shift rows.
+# -i ranks followers saved in twitter.sqlite.
 #
 # Usage:
+#   python3 mkfollower_rank.py -f <user_id>_followers_data.csv [-k 100]
+#   python3 mkfollower_rank.py -i <user_id> [-k 100]
 #
 # Author: Ryosuke Tomita
 # Date: 2021/08/26
 ##########################################################################
-import requests
 import os
 from os.path import join,abspath,dirname
-import json
-import random
+import sys
 import argparse
-import time
 import pandas as pd
 import numpy as np
+sys.path.append(join(abspath(dirname(__file__)),'..'))
+from credentials import load_token_pool
+from twitter_client import TwitterClient
+from storage import read_followers
+from twitter_db import TwitterDB
+from profile_cache import TTL,ProfileCache
+
 
 def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("-f","--file",help="set FollowersList.csv",
                         type=str)
+    parser.add_argument("-i","--userid",help="set user_id saved in twitter.sqlite",
+                        type=str)
+    parser.add_argument("-k","--top",help="save only top k followers",
+                        type=int,default=None)
+    parser.add_argument("--ttl",help="seconds while saved followers_count is used",
+                        type=float,default=TTL)
     p = parser.parse_args()
-    args = {"file":p.file}
+    args = {"file":p.file,"userid":p.userid,"top":p.top,"ttl":p.ttl}
     return args
 
 
@@ -32,22 +48,12 @@ def load_bearer_token():
 
 
 def read_csv(csvfile):
-    df = pd.read_csv(csvfile,header=0,encoding="utf-8",
-                     usecols=(0,1,2,3),
-                     names=('name','id','username','link'))
-
-    with open(csvfile,mode='r') as f:
-        user_id_list = []
-        for i in range(len(df)):
-            user_id_list.append(f.readline().split(',')[1])
+    return read_followers(csvfile,columns=['name','id','username'])
 
-    df['id'] = user_id_list
-    return df
 
-
-def create_params(user_id):
-    return {"user_id":user_id,
-            "include_entities":"false"}
+def read_db(db,user_id):
+    rows = [row[:3] for row in db.followers_rank(user_id)]
+    return pd.DataFrame(rows,columns=['name','id','username'])
 
 
 def create_headers(bearer_token):
@@ -55,56 +61,46 @@ def create_headers(bearer_token):
     return headers
 
 
-def save_file(followers_json,user_id):
-    save_file = (user_id + '_' + 'followers_data.csv')
-    with open(save_file,mode="a") as f:
-        [f.write("{},{},{}\n".format(j['name'],j['id'],j['username'])) for i in followers_json for j in i]
-
+def fetch_followers_count(client,db,user_ids,ttl):
+    cache = ProfileCache(db,ttl=ttl)
+    profiles = cache.lookup(client,user_ids,fields=("followers_count",))
+    print("{} users are cached, {} users are fetched.".format(cache.hits,cache.misses))
+    return {user_id:profile['followers_count'] for user_id,profile in profiles.items()}
 
-def fetch_followers_data(url,payload,headers):
-    response = requests.get(url,params=payload,headers=headers,
-                            timeout=3)
-    if response.status_code == 429:
-        time.sleep(60*15)
-        return fetch_followers_data(url,payload,headers)
-    json_res = response.json()
 
-    follower_number = json_res['followers_count']
+def rank_followers(df,counts,top=None):
+    # join by id. suspended users have no follower_number.
+    df = df.assign(follower_number=df['id'].astype(np.int64).map(counts).astype('Int64'))
+    numbers = df['follower_number'].fillna(-1).to_numpy(dtype=np.int64)
+    if top is not None and top < len(df):
+        df = df.iloc[np.argpartition(-numbers,top-1)[:top]]
+    return df.sort_values('follower_number',ascending=False,kind='stable',na_position='last')
 
-    if response.status_code != 200:
-        print("Request returned an error: {} {}".format(
-              response.status_code, response.text))
 
-    return follower_number
-
-
-def save_file(df,follower_number_list):
-    df["follower_number"] = follower_number_list
+def save_file(df):
+    df = df.assign(link=["https://twitter.com/intent/user?user_id={}".format(i) for i in df['id']])
     df.to_csv('test.csv',
-                        columns=['name','id','username',
-                                 'link','follower_number'],
-                       index=False)
+              columns=['name','id','username',
+                       'link','follower_number'],
+              index=False)
     return None
 
 
 def main():
     args = parse_args()
 
-    csv_file = args['file']
-    df = read_csv(csv_file)
-    follower_number_list = []
-
-    url = 'https://api.twitter.com/1.1/users/show.json'
     bearer_token = load_bearer_token()
-    headers = create_headers(bearer_token)
-
-    for i,user_id in enumerate(df['id']):
-        if not user_id: continue
-        print(user_id)
-        payload = create_params(user_id)
-        follower_number_list.append(fetch_followers_data(url,payload,headers))
-    save_file(df,follower_number_list)
-
+    client = TwitterClient(create_headers(bearer_token),token_pool=load_token_pool())
+    db = TwitterDB()
+
+    if args['userid']:
+        df = read_db(db,args['userid'])
+    else:
+        df = read_csv(args['file'])
+    counts = fetch_followers_count(client,db,df['id'],args['ttl'])
+    db.close()
+    save_file(rank_followers(df,counts,args['top']))
+    client.show_timings()
 
 
 if __name__ == "__main__":
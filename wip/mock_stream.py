@@ -0,0 +1,175 @@
+##########################################################################
+# Name: mock_stream.py
+#
+# Local mock of filtered stream, stream rules and recent search.
+# Each stream connection sends 2 tweets and is disconnected, and one
+# tweet is "posted" while stream is disconnected (found by recent search).
+# Second recent search returns 400, so backfill is skipped once.
+#
+# Usage:
+#   python3 mock_stream.py            # serve, then run
+#   python3 ../monitor_timeline_per1min.py --stream --api-url http://127.0.0.1:8780 -i 1
+#   python3 mock_stream.py --check    # run keep_streaming with 2 tokens and check
+#                                     # reconnect, backfill and token of rules.
+#
+# Author: Ryosuke Tomita
+# Date: 2026/10/18
+##########################################################################
+from os.path import join,abspath,dirname
+from http.server import BaseHTTPRequestHandler,ThreadingHTTPServer
+from urllib.parse import urlparse,parse_qs
+import sys
+import json
+import time
+import argparse
+import threading
+sys.path.append(join(abspath(dirname(__file__)),'..'))
+from credentials import TokenPool
+from seen_ids import SeenIds
+from tweet_stream import TWITTER_EPOCH_MS,keep_streaming,search_range
+from twitter_client import TwitterClient
+
+PORT = 8780
+TWEETS_PER_CONNECTION = 2
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-p","--port",help="port",type=int,default=PORT)
+    parser.add_argument("--check",help="run keep_streaming and check it",action="store_true")
+    p = parser.parse_args()
+    args = {"port":p.port,"check":p.check}
+    return args
+
+
+class MockTwitter:
+    """tweets,rules and tokens which sent requests."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.connections = 0
+        self.searches = 0
+        self.rules = [{"id":"1","value":"from:999","tag":"watchlist"}]
+        self.tokens = []
+
+    def new_tweet(self):
+        with self.lock:
+            self.count += 1
+            tweet_id = (int(time.time()*1000)-TWITTER_EPOCH_MS) << 22 | self.count
+            return {"id":str(tweet_id),"text":"tweet {}".format(self.count),
+                    "author_id":"1","created_at":"2026-10-18T00:00:00.000Z"}
+
+
+def create_handler(mock):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self,*args):
+            pass
+
+        def send_json(self,status,body):
+            content = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type","application/json")
+            self.send_header("Content-Length",str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            mock.tokens.append((self.command,url.path,self.headers.get("Authorization")))
+            if url.path == "/2/tweets/search/stream/rules":
+                self.send_json(200,{"data":mock.rules})
+            elif url.path == "/2/tweets/search/stream":
+                self.stream()
+            elif url.path == "/2/tweets/search/recent":
+                self.recent(parse_qs(url.query))
+            else:
+                self.send_json(404,{"title":"Not Found"})
+
+        def do_POST(self):
+            mock.tokens.append((self.command,urlparse(self.path).path,self.headers.get("Authorization")))
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if "delete" in body:
+                mock.rules = [rule for rule in mock.rules if rule["id"] not in body["delete"]["ids"]]
+            for i,rule in enumerate(body.get("add",[])):
+                mock.rules.append({"id":str(100+i),**rule})
+            self.send_json(200,{"meta":{"sent":"now"}})
+
+        def stream(self):
+            mock.connections += 1
+            self.send_response(200)
+            self.send_header("Content-Type","application/json")
+            self.send_header("Connection","close")
+            self.end_headers()
+            # keep-alive newline, then tweets, then disconnect.
+            self.wfile.write(b"\r\n")
+            for _ in range(TWEETS_PER_CONNECTION):
+                self.wfile.write(json.dumps({"data":mock.new_tweet()}).encode()+b"\r\n")
+                self.wfile.flush()
+                time.sleep(0.05)
+            self.close_connection = True
+
+        def recent(self,query):
+            mock.searches += 1
+            since_id = int(query["since_id"][0])
+            if (since_id >> 22)+TWITTER_EPOCH_MS < (time.time()-7*24*60*60)*1000:
+                self.send_json(400,{"title":"Invalid Request","detail":"since_id is too old"})
+            elif mock.searches == 2:
+                self.send_json(400,{"title":"Invalid Request","detail":"mock error"})
+            else:
+                self.send_json(200,{"data":[mock.new_tweet()],"meta":{"result_count":1}})
+    return Handler
+
+
+def serve(port):
+    mock = MockTwitter()
+    server = ThreadingHTTPServer(("127.0.0.1",port),create_handler(mock))
+    threading.Thread(target=server.serve_forever,daemon=True).start()
+    return mock,server
+
+
+def check(port):
+    mock,server = serve(port)
+    client = TwitterClient({"User-Agent":"mock"},http2=False,token_pool=TokenPool(["A","B"]))
+    seen = SeenIds()
+    received = []
+    threading.Thread(target=keep_streaming,
+                     args=([1,2],client,seen,lambda tweet: received.append(tweet['text'])),
+                     kwargs={"api_url":"http://127.0.0.1:{}".format(port)},daemon=True).start()
+    timeout = time.time()+30
+    while len(received) < 8 and time.time() < timeout:
+        time.sleep(0.1)
+    server.shutdown()
+
+    # connection 1: tweet 1,2. backfill: 3. connection 2: 4,5.
+    # backfill fails (400) and is skipped. connection 3: 6,7. backfill: 8.
+    expected = ["tweet {}".format(i) for i in range(1,9)]
+    assert received[:8] == expected,received
+    assert mock.connections >= 3,mock.connections
+    assert [rule["value"] for rule in mock.rules] == ["from:1 OR from:2"],mock.rules
+    tokens = {token for _,_,token in mock.tokens}
+    assert tokens == {"Bearer A"},mock.tokens
+    old_id = (int((time.time()-8*24*60*60)*1000)-TWITTER_EPOCH_MS) << 22
+    assert "start_time" in search_range(old_id),search_range(old_id)
+    print("ok: {} tweets, {} connections, {} searches, token {}".format(
+        len(received),mock.connections,mock.searches,tokens.pop()))
+
+
+def main():
+    args = parse_args()
+    if args['check']:
+        check(args['port'])
+        return
+    _,server = serve(args['port'])
+    print("mock stream: http://127.0.0.1:{}".format(args['port']))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()